@@ -1,41 +1,239 @@
 import os
 import secrets
+import sqlite3
+import time
 from collections.abc import Callable
-from contextvars import ContextVar
+from functools import cache
+from types import SimpleNamespace
+from urllib.parse import urlsplit
 
+import click
 import jinja2
-from flask import current_app, make_response, render_template, request
+from flask import current_app, g, make_response, request
 from flask_wtf.csrf import CSRFError
 from gds_metrics import GDSMetrics
 from notifications_utils import request_helper
 from notifications_utils.asset_fingerprinter import asset_fingerprinter
 from notifications_utils.base64_uuid import base64_to_uuid, uuid_to_base64
+from notifications_utils.clients.redis.redis_client import RedisClient
 from notifications_utils.eventlet import EventletTimeout
-from notifications_utils.local_vars import LazyLocalGetter
 from notifications_utils.logging import flask as utils_logging
 from werkzeug.local import LocalProxy
 from werkzeug.routing import BaseConverter, ValidationError
 
+from app.cache_control import cache_control_for
+from app.caching import BaseCache, LocalCache, RedisCache, SharedMemoryCache
 from app.config import Config, configs
-from app.notify_client.service_api_client import ServiceApiClient
+from app.fast_path import FastPathMiddleware
+from app.link_scanners import LinkScannerDetector
+from app.notify_client.service_api_client import ServiceApiClient, admin_api_tokens
+from app.security_headers import CSP_NONCE_ENVIRON_KEY, SecurityHeadersMiddleware
+from app.server_timing import init_app as init_server_timing
+from app.server_timing import time_since_request_start
+from app.upstream.budget import RequestBudget
+from app.upstream.bulkhead import Bulkhead
+from app.upstream.circuit_breaker import CircuitBreaker
+from app.upstream.client import UpstreamClient
+from app.upstream.deadline import reset_deadline, set_deadline
+from app.upstream.dns import DNSCache
+from app.upstream.hedging import Hedger, LatencyTracker
+from app.upstream.retry import RetryPolicy
+from app.upstream.session import PooledSession
 
 metrics = GDSMetrics()
+redis_client = RedisClient()
 
 memo_resetters: list[Callable] = []
 
 #
-# "clients" that need thread-local copies
+# "clients" shared by every greenlet in the process
 #
 
-_service_api_client_context_var: ContextVar[ServiceApiClient] = ContextVar("service_api_client")
-get_service_api_client: LazyLocalGetter[ServiceApiClient] = LazyLocalGetter(
-    _service_api_client_context_var,
-    lambda: ServiceApiClient(app=current_app),
-)
-memo_resetters.append(lambda: get_service_api_client.clear())
+
+@cache
+def get_service_cache() -> BaseCache:
+    maxsize = current_app.config["SERVICE_CACHE_MAX_SIZE"]
+    ttl = current_app.config["SERVICE_CACHE_TTL_SECONDS"] + current_app.config["SERVICE_CACHE_MAX_STALENESS_SECONDS"]
+
+    match current_app.config["SERVICE_CACHE_BACKEND"]:
+        case "shared-memory":
+            try:
+                return SharedMemoryCache(
+                    "service", path=current_app.config["SHARED_MEMORY_CACHE_PATH"], maxsize=maxsize, ttl=ttl
+                )
+            except sqlite3.Error as e:
+                # rather than failing every page, as this would be tried again for each request
+                current_app.logger.warning(
+                    "Failed to open shared memory cache at %s, using a local cache instead: %s",
+                    current_app.config["SHARED_MEMORY_CACHE_PATH"],
+                    e,
+                )
+                return LocalCache("service", maxsize=maxsize, ttl=ttl)
+        case "redis":
+            return RedisCache("service", redis_client=redis_client, ttl=ttl)
+        case _:
+            return LocalCache("service", maxsize=maxsize, ttl=ttl)
+
+
+memo_resetters.append(lambda: get_service_cache.cache_clear())
+
+
+@cache
+def get_document_unavailable_cache() -> LocalCache:
+    return LocalCache(
+        "document_unavailable",
+        maxsize=current_app.config["DOCUMENT_UNAVAILABLE_CACHE_MAX_SIZE"],
+        ttl=current_app.config["DOCUMENT_UNAVAILABLE_CACHE_TTL_SECONDS"],
+    )
+
+
+memo_resetters.append(lambda: get_document_unavailable_cache.cache_clear())
+document_unavailable_cache = LocalProxy(get_document_unavailable_cache)
+
+
+@cache
+def get_upstream_session() -> PooledSession:
+    dns_cache = None
+    if current_app.config["UPSTREAM_DNS_CACHE_ENABLED"]:
+        dns_cache = DNSCache(
+            hosts=[
+                urlsplit(current_app.config["API_HOST_NAME"] or "").hostname,
+                urlsplit(current_app.config["DOCUMENT_DOWNLOAD_API_HOST_NAME_INTERNAL"] or "").hostname,
+            ],
+            default_ttl=current_app.config["UPSTREAM_DNS_CACHE_DEFAULT_TTL_SECONDS"],
+            min_ttl=current_app.config["UPSTREAM_DNS_CACHE_MIN_TTL_SECONDS"],
+            max_ttl=current_app.config["UPSTREAM_DNS_CACHE_MAX_TTL_SECONDS"],
+        )
+
+    return PooledSession(pool_maxsize=current_app.config["UPSTREAM_POOL_MAXSIZE"], dns_cache=dns_cache)
+
+
+memo_resetters.append(lambda: get_upstream_session.cache_clear())
+
+
+@cache
+def get_retry_budget() -> RequestBudget:
+    # shared by every upstream, so retries can't add more than this much load in total
+    return RequestBudget(ratio=current_app.config["UPSTREAM_RETRY_BUDGET_RATIO"], max_balance=10)
+
+
+memo_resetters.append(lambda: get_retry_budget.cache_clear())
+
+
+def _create_upstream_client(name, connect_timeout, read_timeout, max_concurrent_requests):
+    return UpstreamClient(
+        name,
+        session=get_upstream_session(),
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        circuit_breaker=CircuitBreaker(
+            name,
+            failure_threshold=current_app.config["CIRCUIT_BREAKER_FAILURE_THRESHOLD"],
+            minimum_calls=current_app.config["CIRCUIT_BREAKER_MINIMUM_CALLS"],
+            window_size=current_app.config["CIRCUIT_BREAKER_WINDOW_SIZE"],
+            reset_timeout=current_app.config["CIRCUIT_BREAKER_RESET_TIMEOUT_SECONDS"],
+        ),
+        bulkhead=Bulkhead(
+            name,
+            max_concurrent=max_concurrent_requests,
+            max_queued=current_app.config["UPSTREAM_MAX_QUEUED_REQUESTS"],
+            max_wait=current_app.config["UPSTREAM_MAX_QUEUE_WAIT_SECONDS"],
+        ),
+        retry_policy=RetryPolicy(
+            name,
+            max_attempts=current_app.config["UPSTREAM_RETRY_MAX_ATTEMPTS"],
+            base_delay=current_app.config["UPSTREAM_RETRY_BASE_DELAY_SECONDS"],
+            max_delay=current_app.config["UPSTREAM_RETRY_MAX_DELAY_SECONDS"],
+            budget=get_retry_budget(),
+        ),
+    )
+
+
+@cache
+def get_notify_api() -> UpstreamClient:
+    return _create_upstream_client(
+        "notify-api",
+        connect_timeout=current_app.config["NOTIFY_API_CONNECT_TIMEOUT_SECONDS"],
+        read_timeout=current_app.config["NOTIFY_API_READ_TIMEOUT_SECONDS"],
+        max_concurrent_requests=current_app.config["NOTIFY_API_MAX_CONCURRENT_REQUESTS"],
+    )
+
+
+memo_resetters.append(lambda: get_notify_api.cache_clear())
+
+
+@cache
+def get_document_download_api() -> UpstreamClient:
+    return _create_upstream_client(
+        "document-download-api",
+        connect_timeout=current_app.config["DOCUMENT_DOWNLOAD_API_CONNECT_TIMEOUT_SECONDS"],
+        read_timeout=current_app.config["DOCUMENT_DOWNLOAD_API_READ_TIMEOUT_SECONDS"],
+        max_concurrent_requests=current_app.config["DOCUMENT_DOWNLOAD_API_MAX_CONCURRENT_REQUESTS"],
+    )
+
+
+memo_resetters.append(lambda: get_document_download_api.cache_clear())
+document_download_api = LocalProxy(get_document_download_api)
+
+
+@cache
+def get_document_check_hedger() -> Hedger:
+    return Hedger(
+        "document_check",
+        percentile=current_app.config["DOCUMENT_CHECK_HEDGE_PERCENTILE"],
+        min_delay=current_app.config["DOCUMENT_CHECK_HEDGE_MIN_DELAY_SECONDS"],
+        budget=RequestBudget(ratio=current_app.config["DOCUMENT_CHECK_HEDGE_BUDGET_RATIO"], max_balance=10),
+        latencies=LatencyTracker(window_size=1000, min_samples=100),
+        # so a second request that fails fast doesn't beat one that's about to succeed
+        is_failure=lambda response: response.status_code >= 500,
+    )
+
+
+memo_resetters.append(lambda: get_document_check_hedger.cache_clear())
+document_check_hedger = LocalProxy(get_document_check_hedger)
+
+
+@cache
+def get_service_api_client() -> ServiceApiClient:
+    # holds no per-request state - onwards request headers are read from the request context on each call
+    return ServiceApiClient(app=current_app, cache=get_service_cache(), upstream=get_notify_api())
+
+
+memo_resetters.append(lambda: get_service_api_client.cache_clear())
+memo_resetters.append(lambda: admin_api_tokens.clear())
 service_api_client = LocalProxy(get_service_api_client)
 
 
+@cache
+def get_link_scanner_detector() -> LinkScannerDetector:
+    return LinkScannerDetector(
+        user_agents=current_app.config["LINK_SCANNER_USER_AGENTS"],
+        ip_ranges=current_app.config["LINK_SCANNER_IP_RANGES"],
+        prefetch_headers=current_app.config["LINK_SCANNER_PREFETCH_HEADERS"],
+        trusted_proxies=current_app.config["LINK_SCANNER_TRUSTED_PROXIES"],
+    )
+
+
+memo_resetters.append(lambda: get_link_scanner_detector.cache_clear())
+link_scanner_detector = LocalProxy(get_link_scanner_detector)
+
+# rendered into error pages where the request's CSP nonce goes
+ERROR_PAGE_CSP_NONCE_PLACEHOLDER = "__csp_nonce_placeholder__"
+
+
+@cache
+def get_error_page(template_name) -> list[bytes]:
+    # rendered once for the process rather than for every error, as they're the same for every request apart from the
+    # nonce - split around it so it can be joined back in
+    context = {"request": SimpleNamespace(csp_nonce=ERROR_PAGE_CSP_NONCE_PLACEHOLDER)}
+    current_app.update_template_context(context)
+    page = current_app.jinja_env.get_template(template_name).render(context)
+    return [part.encode() for part in page.split(ERROR_PAGE_CSP_NONCE_PLACEHOLDER)]
+
+
+memo_resetters.append(lambda: get_error_page.cache_clear())
+
+
 class Base64UUIDConverter(BaseConverter):
     def to_python(self, value):
         try:
@@ -59,12 +257,14 @@ def create_app(application):
 
     application.url_map.converters["base64_uuid"] = Base64UUIDConverter
 
+    init_server_timing(application)
     init_app(application)
     # Metrics intentionally high up to give the most accurate timing and reliability that the metric is recorded
     metrics.init_app(application)
     init_jinja(application)
     utils_logging.init_app(application)
     request_helper.init_app(application)
+    redis_client.init_app(application)
 
     from app.main import main as main_blueprint
 
@@ -77,11 +277,20 @@ def create_app(application):
 
     register_errorhandlers(application)
 
+    # outside Flask, so that health checks and legacy links don't go through it at all
+    application.wsgi_app = FastPathMiddleware(
+        application.wsgi_app,
+        document_download_api_host_name=application.config["DOCUMENT_DOWNLOAD_API_HOST_NAME"],
+    )
+    application.wsgi_app = SecurityHeadersMiddleware(application.wsgi_app)
+
 
 def init_app(application):
-    application.after_request(useful_headers_after_request)
+    application.after_request(cache_control_after_request)
 
     application.before_request(make_nonce_before_request)
+    application.before_request(set_upstream_deadline_before_request)
+    application.teardown_request(reset_upstream_deadline_teardown_request)
 
     @application.context_processor
     def inject_global_template_variables():
@@ -104,44 +313,38 @@ def make_nonce_before_request():
     # `govuk_frontend_jinja/template.html` can be extended and inline `<script>` can be added without CSP complaining
     if not getattr(request, "csp_nonce", None):
         request.csp_nonce = secrets.token_urlsafe(16)
+    request.environ[CSP_NONCE_ENVIRON_KEY] = request.csp_nonce
 
 
-#  https://www.owasp.org/index.php/List_of_useful_HTTP_headers
-def useful_headers_after_request(response):
-    response.headers.add("X-Robots-Tag", "noindex, nofollow")
-    response.headers.add("X-Frame-Options", "DENY")
-    response.headers.add("X-Content-Type-Options", "nosniff")
-    response.headers.add("X-Permitted-Cross-Domain-Policies", "none")
-    response.headers.add("Referrer-Policy", "no-referrer")
-    response.headers.add(
-        "Content-Security-Policy",
-        (
-            "default-src 'self';"
-            "script-src 'self' 'nonce-{csp_nonce}';"
-            "connect-src 'self';"
-            "object-src 'self';"
-            "font-src 'self' data:;"
-            "img-src 'self' data:;"
-            "style-src 'self' 'nonce-{csp_nonce}';"
-            "frame-ancestors 'self';"
-            "frame-src 'self';".format(
-                csp_nonce=getattr(request, "csp_nonce", ""),
-            )
-        ),
+def set_upstream_deadline_before_request():
+    # stop waiting on upstream APIs in time to send our 504 page, rather than EventletTimeoutMiddleware killing the
+    # request part way through a call. Counted from when the request reached the app, as EventletTimeoutMiddleware's is
+    g.upstream_deadline_token = set_deadline(
+        current_app.config["HTTP_SERVE_TIMEOUT_SECONDS"]
+        - current_app.config["UPSTREAM_DEADLINE_MARGIN_SECONDS"]
+        - time_since_request_start()
     )
-    if "Cache-Control" in response.headers:
-        del response.headers["Cache-Control"]
-    response.headers.add("Cache-Control", "no-store, no-cache, private, must-revalidate")
-
-    response.headers.add("Strict-Transport-Security", "max-age=31536000; includeSubDomains; preload")
-    response.headers.add("Cross-Origin-Embedder-Policy", "require-corp;")
-    response.headers.add("Cross-Origin-Opener-Policy", "same-origin;")
-    response.headers.add("Cross-Origin-Resource-Policy", "same-origin;")
-    response.headers.add(
-        "Permissions-Policy",
-        "geolocation=(), microphone=(), camera=(), autoplay=(), payment=(), sync-xhr=()",
+
+
+def reset_upstream_deadline_teardown_request(error):
+    if token := g.pop("upstream_deadline_token", None):
+        reset_deadline(token)
+
+
+def cache_control_after_request(response):
+    # timed inline rather than with `timed`, as this runs for every response and very few are being timed
+    timings = g.get("server_timings")
+    start = time.perf_counter() if timings is not None else None
+
+    response.headers["Cache-Control"] = cache_control_for(
+        request.endpoint,
+        response.status_code,
+        has_query_string=bool(request.query_string),
+        sets_cookie="Set-Cookie" in response.headers,
     )
-    response.headers.add("Server", "Cloudfront")
+
+    if timings is not None:
+        timings["headers"] = timings.get("headers", 0) + time.perf_counter() - start
     return response
 
 
@@ -150,7 +353,8 @@ def register_errorhandlers(application):
         if not error_page_template:
             error_page_template = error_code
 
-        return make_response(render_template(f"error/{error_page_template}.html"), error_code)
+        error_page = get_error_page(f"error/{error_page_template}.html")
+        return make_response(getattr(request, "csp_nonce", "").encode().join(error_page), error_code)
 
     @application.errorhandler(410)
     @application.errorhandler(404)
@@ -160,6 +364,13 @@ def register_errorhandlers(application):
     def handle_http_error(error):
         return _error_response(error.code)
 
+    @application.errorhandler(503)
+    def handle_service_unavailable(error):
+        # notify-api's errors are passed on by `abort`ing with their status code, so this is when it was unavailable
+        # or unreachable (including if its circuit breaker or bulkhead refused the call). Anything else refusing or
+        # failing to reach an upstream is handled as an `Exception`
+        return _error_response(503, error_page_template=500)
+
     @application.errorhandler(500)
     @application.errorhandler(Exception)
     def handle_bad_request(error):
@@ -191,3 +402,26 @@ def init_jinja(application):
         ]
     )
     application.jinja_loader = jinja_loader
+
+    if precompiled_templates_path := application.config["PRECOMPILED_TEMPLATES_PATH"]:
+        # in front of Flask's own loader, which only loads templates from source
+        application.jinja_env.loader = jinja2.ChoiceLoader(
+            [jinja2.ModuleLoader(precompiled_templates_path), application.jinja_env.loader]
+        )
+
+    @application.cli.command("compile-templates")
+    @click.argument("target")
+    def compile_templates_command(target):
+        """
+        Compile the app's templates into TARGET, for PRECOMPILED_TEMPLATES_PATH.
+        """
+        compile_templates(application, target)
+
+
+def compile_templates(application, target):
+    """
+    Compile all the app's templates, from source, into modules in `target` for `jinja2.ModuleLoader`.
+    """
+    application.jinja_env.overlay(loader=application.jinja_loader).compile_templates(
+        target, zip=None, ignore_errors=False
+    )
@@ -0,0 +1,24 @@
+NO_STORE = "no-store, no-cache, private, must-revalidate"
+
+# how many seconds browsers and CDNs can cache successful responses from each endpoint for. Nothing else is cached at
+# all, as most of our pages are only meant for whoever was sent the document. Endpoints listed here mustn't use the
+# session, as its cookie is only set after the Cache-Control header's been decided
+MAX_AGES = {
+    # permanent redirects to document-download-api
+    "main.services": 60 * 60 * 24,
+    # redirect to the Cabinet Office's vulnerability disclosure policy
+    "main.security_policy": 60 * 60,
+}
+
+
+def cache_control_for(endpoint, status_code, has_query_string=False, sets_cookie=False):
+    """
+    The Cache-Control header for a response from `endpoint`.
+
+    Responses to URLs with a query string are only cached by browsers, not CDNs, as that's where document keys go.
+    """
+    max_age = MAX_AGES.get(endpoint)
+    if max_age is None or status_code >= 400 or sets_cookie:
+        return NO_STORE
+
+    return f"{'private' if has_query_string else 'public'}, max-age={max_age}"
@@ -0,0 +1,169 @@
+import abc
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from cachetools import TTLCache
+from gds_metrics.metrics import Counter
+
+CACHE_LOOKUPS = Counter(
+    "cache_lookups",
+    "Lookups in a cache, by whether the value was found",
+    ["cache", "result"],
+)
+
+logger = logging.getLogger(__name__)
+
+
+class BaseCache(abc.ABC):
+    """
+    A cache of JSON-serialisable values, which expire `ttl` seconds after they are set.
+
+    Subclasses decide where values are held: in each worker process (`LocalCache`), shared by the workers on a host
+    (`SharedMemoryCache`) or shared by every instance of the app (`RedisCache`).
+    """
+
+    def __init__(self, name, ttl):
+        self.name = name
+        self.ttl = ttl
+        self._hits = CACHE_LOOKUPS.labels(name, "hit")
+        self._misses = CACHE_LOOKUPS.labels(name, "miss")
+
+    def get(self, key):
+        value = self._get(key)
+
+        if value is None:
+            self._misses.inc()
+        else:
+            self._hits.inc()
+
+        return value
+
+    @abc.abstractmethod
+    def set(self, key, value):
+        pass
+
+    @abc.abstractmethod
+    def _get(self, key):
+        pass
+
+
+class LocalCache(BaseCache):
+    """
+    A bounded cache held in the memory of a single worker process. Once `maxsize` entries are held the least recently
+    used one is evicted to make room.
+    """
+
+    def __init__(self, name, maxsize, ttl, timer=time.monotonic):
+        super().__init__(name, ttl)
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, timer=timer)
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            return self._cache.get(key)
+
+    def set(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self):
+        return len(self._cache)
+
+
+class SharedMemoryCache(BaseCache):
+    """
+    A bounded cache shared by every worker process on a host, so each value is only fetched and held once per host
+    rather than once per worker.
+
+    Values are kept in an SQLite database at `path`, which should be on a memory-backed filesystem such as `/dev/shm`.
+    SQLite handles locking between the processes, and its write-ahead log is memory-mapped by each of them. Reads and
+    writes are quick enough that they aren't handed off from the eventlet hub. Once more than `maxsize` entries are
+    held, those closest to expiring are evicted to make room.
+
+    Waiting for another process's lock blocks the whole worker, not just the request, so it's only waited on for
+    `busy_timeout` seconds. If the database can't be used in time, lookups miss and values aren't stored, rather than
+    the request failing. If it can't be opened at all, `sqlite3.Error` is raised.
+    """
+
+    def __init__(self, name, path, maxsize, ttl, busy_timeout=0.05, timer=time.time):
+        super().__init__(name, ttl)
+        self.maxsize = maxsize
+        self._timer = timer
+        self._lock = threading.Lock()
+
+        self._connection = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        try:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=OFF")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "cache TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL, "
+                "PRIMARY KEY (cache, key))"
+            )
+        except sqlite3.Error:
+            self._connection.close()
+            raise
+
+    def _get(self, key):
+        try:
+            with self._lock:
+                row = self._connection.execute(
+                    "SELECT value FROM cache WHERE cache = ? AND key = ? AND expires_at > ?",
+                    (self.name, key, self._timer()),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Failed to read %s from %s cache: %s", key, self.name, e)
+            return None
+
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value):
+        try:
+            self._set(key, value)
+        except sqlite3.Error as e:
+            logger.warning("Failed to store %s in %s cache: %s", key, self.name, e)
+
+    def _set(self, key, value):
+        now = self._timer()
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO cache (cache, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.name, key, json.dumps(value), now + self.ttl),
+            )
+            self._connection.execute(
+                "DELETE FROM cache WHERE cache = ? AND (expires_at <= ? OR key IN ("
+                "SELECT key FROM cache WHERE cache = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?))",
+                (self.name, now, self.name, self.maxsize),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM cache WHERE cache = ?", (self.name,))
+
+
+class RedisCache(BaseCache):
+    """
+    A cache in Redis, shared by every instance of the app.
+    """
+
+    def __init__(self, name, redis_client, ttl):
+        super().__init__(name, ttl)
+        self.redis_client = redis_client
+
+    def _get(self, key):
+        value = self.redis_client.get(self._redis_key(key))
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.redis_client.set(self._redis_key(key), json.dumps(value), ex=self.ttl)
+
+    def _redis_key(self, key):
+        return f"document-download-frontend-{self.name}-{key}"
@@ -20,6 +20,109 @@ class Config:
     DOCUMENT_DOWNLOAD_API_HOST_NAME = os.environ.get("DOCUMENT_DOWNLOAD_API_HOST_NAME")
     DOCUMENT_DOWNLOAD_API_HOST_NAME_INTERNAL = os.environ.get("DOCUMENT_DOWNLOAD_API_HOST_NAME_INTERNAL")
 
+    # Keep-alive connections kept per upstream host by each worker. Defaults to gunicorn's `worker_connections`
+    # so that every request a worker is serving at once can hand its connection back to the pool
+    UPSTREAM_POOL_MAXSIZE = int(os.environ.get("UPSTREAM_POOL_MAXSIZE", os.environ.get("WORKER_CONNECTIONS", 1000)))
+
+    # Cache the addresses of API_HOST_NAME and DOCUMENT_DOWNLOAD_API_HOST_NAME_INTERNAL for as long as their DNS records
+    # say (within these limits), rather than looking them up for every new connection. The default TTL is used for
+    # hosts whose TTL isn't known, such as those in /etc/hosts
+    UPSTREAM_DNS_CACHE_ENABLED = os.environ.get("UPSTREAM_DNS_CACHE_ENABLED") == "1"
+    UPSTREAM_DNS_CACHE_DEFAULT_TTL_SECONDS = int(os.environ.get("UPSTREAM_DNS_CACHE_DEFAULT_TTL_SECONDS", 30))
+    UPSTREAM_DNS_CACHE_MIN_TTL_SECONDS = int(os.environ.get("UPSTREAM_DNS_CACHE_MIN_TTL_SECONDS", 5))
+    UPSTREAM_DNS_CACHE_MAX_TTL_SECONDS = int(os.environ.get("UPSTREAM_DNS_CACHE_MAX_TTL_SECONDS", 300))
+
+    # Connect and read timeouts for each upstream API, well inside HTTP_SERVE_TIMEOUT_SECONDS so a slow API can't hold
+    # on to a worker's greenlets until the whole request is killed
+    NOTIFY_API_CONNECT_TIMEOUT_SECONDS = float(os.environ.get("NOTIFY_API_CONNECT_TIMEOUT_SECONDS", 3))
+    NOTIFY_API_READ_TIMEOUT_SECONDS = float(os.environ.get("NOTIFY_API_READ_TIMEOUT_SECONDS", 10))
+    DOCUMENT_DOWNLOAD_API_CONNECT_TIMEOUT_SECONDS = float(
+        os.environ.get("DOCUMENT_DOWNLOAD_API_CONNECT_TIMEOUT_SECONDS", 3)
+    )
+    DOCUMENT_DOWNLOAD_API_READ_TIMEOUT_SECONDS = float(os.environ.get("DOCUMENT_DOWNLOAD_API_READ_TIMEOUT_SECONDS", 10))
+
+    # Requests each worker can have in flight to each upstream API at once, so that one being slow can't tie up every
+    # greenlet. Past that, up to UPSTREAM_MAX_QUEUED_REQUESTS wait up to UPSTREAM_MAX_QUEUE_WAIT_SECONDS for a turn, and
+    # the rest are refused
+    NOTIFY_API_MAX_CONCURRENT_REQUESTS = int(os.environ.get("NOTIFY_API_MAX_CONCURRENT_REQUESTS", 100))
+    DOCUMENT_DOWNLOAD_API_MAX_CONCURRENT_REQUESTS = int(
+        os.environ.get("DOCUMENT_DOWNLOAD_API_MAX_CONCURRENT_REQUESTS", 200)
+    )
+    UPSTREAM_MAX_QUEUED_REQUESTS = int(os.environ.get("UPSTREAM_MAX_QUEUED_REQUESTS", 100))
+    UPSTREAM_MAX_QUEUE_WAIT_SECONDS = float(os.environ.get("UPSTREAM_MAX_QUEUE_WAIT_SECONDS", 1))
+
+    # Idempotent requests that can't connect, or get a 502, 503 or 504, are tried up to UPSTREAM_RETRY_MAX_ATTEMPTS
+    # times in all, with random waits of up to an exponentially increasing limit in between. Retries are limited to
+    # UPSTREAM_RETRY_BUDGET_RATIO of all upstream requests
+    UPSTREAM_RETRY_MAX_ATTEMPTS = int(os.environ.get("UPSTREAM_RETRY_MAX_ATTEMPTS", 3))
+    UPSTREAM_RETRY_BASE_DELAY_SECONDS = float(os.environ.get("UPSTREAM_RETRY_BASE_DELAY_SECONDS", 0.05))
+    UPSTREAM_RETRY_MAX_DELAY_SECONDS = float(os.environ.get("UPSTREAM_RETRY_MAX_DELAY_SECONDS", 1))
+    UPSTREAM_RETRY_BUDGET_RATIO = float(os.environ.get("UPSTREAM_RETRY_BUDGET_RATIO", 0.1))
+
+    # How long EventletTimeoutMiddleware lets a request run. Upstream calls are cut short so that they finish at least
+    # UPSTREAM_DEADLINE_MARGIN_SECONDS before then, leaving time to send a 504 page
+    HTTP_SERVE_TIMEOUT_SECONDS = int(os.environ.get("HTTP_SERVE_TIMEOUT_SECONDS", 30))
+    UPSTREAM_DEADLINE_MARGIN_SECONDS = float(os.environ.get("UPSTREAM_DEADLINE_MARGIN_SECONDS", 1))
+
+    # If a document check is slower than this percentile of recent ones, send a second one and use whichever answers
+    # first. Second checks are limited to DOCUMENT_CHECK_HEDGE_BUDGET_RATIO of all checks
+    DOCUMENT_CHECK_HEDGING_ENABLED = os.environ.get("DOCUMENT_CHECK_HEDGING_ENABLED") == "1"
+    DOCUMENT_CHECK_HEDGE_PERCENTILE = float(os.environ.get("DOCUMENT_CHECK_HEDGE_PERCENTILE", 95))
+    DOCUMENT_CHECK_HEDGE_MIN_DELAY_SECONDS = float(os.environ.get("DOCUMENT_CHECK_HEDGE_MIN_DELAY_SECONDS", 0.05))
+    DOCUMENT_CHECK_HEDGE_BUDGET_RATIO = float(os.environ.get("DOCUMENT_CHECK_HEDGE_BUDGET_RATIO", 0.05))
+
+    # Stop calling an upstream API for a while once this proportion of recent calls to it have failed
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD = float(os.environ.get("CIRCUIT_BREAKER_FAILURE_THRESHOLD", 0.5))
+    CIRCUIT_BREAKER_MINIMUM_CALLS = int(os.environ.get("CIRCUIT_BREAKER_MINIMUM_CALLS", 20))
+    CIRCUIT_BREAKER_WINDOW_SIZE = int(os.environ.get("CIRCUIT_BREAKER_WINDOW_SIZE", 100))
+    CIRCUIT_BREAKER_RESET_TIMEOUT_SECONDS = float(os.environ.get("CIRCUIT_BREAKER_RESET_TIMEOUT_SECONDS", 30))
+
+    # Services are looked up on every page view, but their name and contact details rarely change
+    SERVICE_CACHE_TTL_SECONDS = int(os.environ.get("SERVICE_CACHE_TTL_SECONDS", 60))
+    # Keep serving a cached service for this long after it's due to be refreshed, while refreshing it in the background.
+    # This also keeps pages working if notify-api is having problems. Set to 0 to always wait for a fresh copy
+    SERVICE_CACHE_MAX_STALENESS_SECONDS = int(os.environ.get("SERVICE_CACHE_MAX_STALENESS_SECONDS", 0))
+
+    # Where cached services are held: "local" to each worker process, "shared-memory" between the workers on a host, or
+    # "redis" to share them between every instance
+    SERVICE_CACHE_BACKEND = os.environ.get("SERVICE_CACHE_BACKEND", "local")
+    SHARED_MEMORY_CACHE_PATH = os.environ.get(
+        "SHARED_MEMORY_CACHE_PATH", "/dev/shm/document-download-frontend-cache.sqlite3"
+    )
+
+    REDIS_ENABLED = os.environ.get("REDIS_ENABLED") == "1"
+    REDIS_URL = os.environ.get("REDIS_URL")
+    SERVICE_CACHE_MAX_SIZE = int(os.environ.get("SERVICE_CACHE_MAX_SIZE", 1000))
+
+    # Links to missing or expired documents tend to be followed repeatedly, so remember them for a short while
+    DOCUMENT_UNAVAILABLE_CACHE_TTL_SECONDS = int(os.environ.get("DOCUMENT_UNAVAILABLE_CACHE_TTL_SECONDS", 30))
+    DOCUMENT_UNAVAILABLE_CACHE_MAX_SIZE = int(os.environ.get("DOCUMENT_UNAVAILABLE_CACHE_MAX_SIZE", 10000))
+
+    # How long the pages after the landing page trust what it found out about the service and document
+    VERIFIED_DOCUMENT_MAX_AGE_SECONDS = int(os.environ.get("VERIFIED_DOCUMENT_MAX_AGE_SECONDS", 300))
+
+    # Render the landing page from the service alone, and only check the document when the recipient continues
+    LAZY_DOCUMENT_CHECK = os.environ.get("LAZY_DOCUMENT_CHECK") == "1"
+
+    # Mail gateways fetch every link in an email before delivering it. Landing page requests matching any of these
+    # newline-separated user agent regexes (as regexes can contain commas), comma-separated client IP ranges or
+    # comma-separated "Header: value" prefetch headers get a page that doesn't look up the service or document.
+    # Client IP addresses are taken from the X-Forwarded-For entry added by the last of this many proxies in front of
+    # the app
+    LINK_SCANNER_USER_AGENTS = list(filter(None, os.environ.get("LINK_SCANNER_USER_AGENTS", "").splitlines()))
+    LINK_SCANNER_IP_RANGES = list(filter(None, os.environ.get("LINK_SCANNER_IP_RANGES", "").split(",")))
+    LINK_SCANNER_PREFETCH_HEADERS = list(filter(None, os.environ.get("LINK_SCANNER_PREFETCH_HEADERS", "").split(",")))
+    LINK_SCANNER_TRUSTED_PROXIES = int(os.environ.get("LINK_SCANNER_TRUSTED_PROXIES", 1))
+
+    # Send a Server-Timing header, and log how long each stage of a request took. Can also be turned on for a single
+    # request by sending a token from `app.server_timing.sign_debug_token` in the X-Server-Timing-Token header
+    SERVER_TIMING_ENABLED = os.environ.get("SERVER_TIMING_ENABLED") == "1"
+    SERVER_TIMING_DEBUG_TOKEN_MAX_AGE_SECONDS = int(os.environ.get("SERVER_TIMING_DEBUG_TOKEN_MAX_AGE_SECONDS", 3600))
+
+    # Load templates from modules made by `flask compile-templates` when the image was built, rather than each worker
+    # parsing and compiling them the first time they're used. Templates that aren't there are loaded from source
+    PRECOMPILED_TEMPLATES_PATH = os.environ.get("PRECOMPILED_TEMPLATES_PATH")
+
     HEADER_COLOUR = os.environ.get("HEADER_COLOUR", "#FFBF47")  # $yellow
     HTTP_PROTOCOL = os.environ.get("HTTP_PROTOCOL", "http")
 
@@ -35,6 +138,9 @@ class Development(Config):
     ADMIN_CLIENT_SECRET = "dev-notify-secret-key"
     SECRET_KEY = "dev-notify-secret-key"
 
+    # so that changes to templates show up straight away
+    PRECOMPILED_TEMPLATES_PATH = None
+
     DEBUG = True
 
 
@@ -0,0 +1,135 @@
+import re
+from time import monotonic
+
+from gds_metrics.metrics import HTTP_SERVER_REQUEST_DURATION_SECONDS, HTTP_SERVER_REQUESTS_TOTAL
+from markupsafe import escape
+from werkzeug.urls import iri_to_uri
+from werkzeug.wsgi import get_host
+
+from app.cache_control import cache_control_for
+
+_UUID = "[A-Fa-f0-9]{8}-[A-Fa-f0-9]{4}-[A-Fa-f0-9]{4}-[A-Fa-f0-9]{4}-[A-Fa-f0-9]{12}"
+
+STATUS_RULE = "/_status"
+STATUS_BODY = b'{"status":"ok"}\n'
+
+# paths the `services` view redirects to document-download-api, and the rule each is routed by in `app.main`
+SERVICES_REDIRECT_RULES = [
+    (re.compile("/services/_status"), "/services/_status"),
+    (
+        re.compile(f"/services/{_UUID}/documents/{_UUID}"),
+        "/services/<uuid:service_id>/documents/<uuid:document_id>",
+    ),
+    (
+        re.compile(f"/services/{_UUID}/documents/{_UUID}\\.[^/]+"),
+        "/services/<uuid:service_id>/documents/<uuid:document_id>.<extension>",
+    ),
+    (
+        re.compile(f"/services/{_UUID}/documents/{_UUID}/check"),
+        "/services/<uuid:service_id>/documents/<uuid:document_id>/check",
+    ),
+]
+
+
+def _redirect_body(location):
+    # the same page `flask.redirect` sends
+    html_location = escape(location)
+    return (
+        "<!doctype html>\n"
+        "<html lang=en>\n"
+        "<title>Redirecting...</title>\n"
+        "<h1>Redirecting...</h1>\n"
+        "<p>You should be redirected automatically to the target URL: "
+        f'<a href="{html_location}">{html_location}</a>. If not, click the link.\n'
+    ).encode()
+
+
+class FastPathMiddleware:
+    """
+    Answers `GET`s of `/_status` and the legacy `/services/...` links without going through Flask, as neither needs
+    anything from it. Responses have the same status, body and caching headers as the `status` and `services` views
+    would give, and are counted in the same request metrics. Security headers are added around both, by
+    `SecurityHeadersMiddleware`.
+
+    Nothing else Flask would do happens for them. In particular they skip `request_helper`'s trace id headers and
+    request logging, and the Server-Timing header, as none of those are worth their cost on these paths. Their
+    duration is timed from when this middleware is called.
+
+    Everything else is passed on to `wsgi_app`.
+    """
+
+    def __init__(self, wsgi_app, document_download_api_host_name):
+        self.wsgi_app = wsgi_app
+        self.document_download_api_host_name = document_download_api_host_name
+
+        self._status_headers = [
+            ("Cache-Control", cache_control_for("main.status", 200)),
+            ("Content-Type", "application/json"),
+            ("Content-Length", str(len(STATUS_BODY))),
+        ]
+        # by whether there's a query string
+        self._redirect_headers = {
+            has_query_string: [
+                ("Cache-Control", cache_control_for("main.services", 301, has_query_string=has_query_string)),
+                ("Content-Type", "text/html; charset=utf-8"),
+            ]
+            for has_query_string in (False, True)
+        }
+
+    def __call__(self, environ, start_response):
+        start = monotonic()
+        if environ["REQUEST_METHOD"] not in ("GET", "HEAD"):
+            return self.wsgi_app(environ, start_response)
+
+        path = environ.get("PATH_INFO", "")
+
+        if path == STATUS_RULE:
+            return self._respond(
+                environ, start_response, start, STATUS_RULE, "200 OK", self._status_headers, STATUS_BODY
+            )
+
+        if path.startswith("/services/") and (rule := self._services_redirect_rule(path)):
+            query_string = environ.get("QUERY_STRING", "")
+            if not (path.isascii() and query_string.isascii()):
+                # leave Flask to decode anything unusual
+                return self.wsgi_app(environ, start_response)
+
+            location = f"{self.document_download_api_host_name}{path}"
+            if len(query_string) > 1:
+                location = f"{location}?{query_string}"
+
+            body = _redirect_body(location)
+            return self._respond(
+                environ,
+                start_response,
+                start,
+                rule,
+                "301 MOVED PERMANENTLY",
+                [
+                    *self._redirect_headers[bool(query_string)],
+                    ("Content-Length", str(len(body))),
+                    ("Location", iri_to_uri(location)),
+                ],
+                body,
+            )
+
+        return self.wsgi_app(environ, start_response)
+
+    @staticmethod
+    def _services_redirect_rule(path):
+        for pattern, rule in SERVICES_REDIRECT_RULES:
+            if pattern.fullmatch(path):
+                return rule
+        return None
+
+    @staticmethod
+    def _respond(environ, start_response, start, rule, status, headers, body):
+        start_response(status, headers)
+
+        method = environ["REQUEST_METHOD"]
+        status_code = int(status.split(" ", 1)[0])
+        host = get_host(environ)
+        HTTP_SERVER_REQUEST_DURATION_SECONDS.labels(method, host, rule, status_code).observe(monotonic() - start)
+        HTTP_SERVER_REQUESTS_TOTAL.labels(method, host, rule, status_code).inc()
+
+        return [body] if method == "GET" else []
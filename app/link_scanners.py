@@ -0,0 +1,67 @@
+import ipaddress
+import re
+
+from gds_metrics.metrics import Counter
+
+LINK_SCANNER_REQUESTS_DIVERTED = Counter(
+    "link_scanner_requests_diverted",
+    "Landing page requests from email link scanners that were answered without calling our upstream APIs",
+    ["reason"],
+)
+
+
+class LinkScannerDetector:
+    """
+    Spots requests from the link scanners that mail gateways run over every link in an email before it's delivered,
+    so that they can be answered without looking up the service or document.
+
+    Nothing is detected unless it's been configured. A person wrongly taken for a scanner only sees a page telling
+    them to open the link in their browser, so the request headers can be trusted for this. The client's IP address
+    is taken from the `X-Forwarded-For` entry added by the last of `trusted_proxies` in front of the app, as
+    `werkzeug`'s `ProxyFix` would, so it can't be picked by the client.
+    """
+
+    def __init__(self, user_agents=(), ip_ranges=(), prefetch_headers=(), trusted_proxies=1):
+        self.user_agent_pattern = re.compile("|".join(user_agents), re.IGNORECASE) if user_agents else None
+        self.ip_networks = [ipaddress.ip_network(ip_range.strip(), strict=False) for ip_range in ip_ranges]
+        self.prefetch_headers = [
+            (name.strip(), value.strip().lower())
+            for name, value in (header.split(":", 1) for header in prefetch_headers)
+        ]
+        self.trusted_proxies = trusted_proxies
+
+    def detect(self, request):
+        """
+        Returns why `request` looks like it came from a link scanner, or None if it doesn't.
+        """
+        if self.user_agent_pattern and self.user_agent_pattern.search(request.user_agent.string):
+            return "user_agent"
+
+        if self.ip_networks and self._from_ip_range(request):
+            return "ip_range"
+
+        for name, value in self.prefetch_headers:
+            if request.headers.get(name, "").strip().lower() == value:
+                return "prefetch_header"
+
+        return None
+
+    def _from_ip_range(self, request):
+        client_ip_address = self._client_ip_address(request)
+        if not client_ip_address:
+            return False
+
+        try:
+            ip_address = ipaddress.ip_address(client_ip_address)
+        except ValueError:
+            return False
+
+        return any(ip_address in network for network in self.ip_networks)
+
+    def _client_ip_address(self, request):
+        if self.trusted_proxies and (forwarded_for := request.headers.get("X-Forwarded-For")):
+            addresses = [address.strip() for address in forwarded_for.split(",")]
+            if len(addresses) >= self.trusted_proxies:
+                return addresses[-self.trusted_proxies]
+
+        return request.remote_addr
@@ -1,7 +1,7 @@
+from contextlib import suppress
 from datetime import date, timedelta
 from urllib import parse
 
-import requests
 from dateutil import parser
 from flask import abort, current_app, redirect, render_template, request, url_for
 from flask.ctx import has_request_context
@@ -11,13 +11,28 @@ from notifications_utils.file_types import format_file_type
 from notifications_utils.formatters import format_file_size
 from werkzeug.exceptions import Gone, NotFound, TooManyRequests
 
-from app import service_api_client
+from app import (
+    document_check_hedger,
+    document_download_api,
+    document_unavailable_cache,
+    link_scanner_detector,
+    service_api_client,
+)
 from app.forms import EmailAddressForm
+from app.link_scanners import LINK_SCANNER_REQUESTS_DIVERTED
 from app.main import main
+from app.server_timing import timed
+from app.upstream.singleflight import SingleFlight
 from app.utils import (
+    BackgroundCall,
     assess_contact_type,
     document_has_expired,
+    document_link_fingerprint,
 )
+from app.verified_document import load_verified_document, sign_verified_document
+
+# concurrent checks of the same document in this process make one call to document-download-api between them
+_document_metadata_calls = SingleFlight("document_metadata")
 
 
 @main.route("/_status")
@@ -55,24 +70,78 @@ def landing(service_id, document_id):
     if not key:
         abort(404)
 
-    service = _get_service_or_raise_error(service_id)
+    if link_scanner_reason := link_scanner_detector.detect(request):
+        # don't make the APIs look up the service and document for every mail gateway that checks the link
+        LINK_SCANNER_REQUESTS_DIVERTED.labels(link_scanner_reason).inc()
+        return render_template("views/link-scanner.html")
+
+    if current_app.config["LAZY_DOCUMENT_CHECK"]:
+        # only check the document once the recipient continues, so views of this page cost document-download-api
+        # nothing
+        service = _get_service_or_raise_error(service_id)
+        get_metadata = None
+    else:
+        service, get_metadata = _get_service_and_document_metadata(service_id, document_id, key)
 
     service_name = service["data"]["name"]
     service_contact_info = service["data"]["contact_link"]
     contact_info_type = assess_contact_type(service_contact_info)
 
+    if get_metadata is None:
+        continue_url = url_for("main.continue_to_document", service_id=service_id, document_id=document_id, key=key)
+
+    else:
+        try:
+            metadata = get_metadata()
+        except (Gone, NotFound) as e:
+            # pretty-up these particular errors with more context
+            return render_template(
+                "views/file-unavailable.html",
+                status_code=e.code,
+                service_name=service_name,
+                service_contact_info=service_contact_info,
+                contact_info_type=contact_info_type,
+            ), e.code
+
+        continue_url = _get_continue_url(service_id, document_id, key, service, metadata)
+
+    return render_template(
+        "views/landing.html",
+        service_id=service_id,
+        service_name=service_name,
+        service_contact_info=service_contact_info,
+        contact_info_type=contact_info_type,
+        document_id=document_id,
+        key=key,
+        continue_url=continue_url,
+    )
+
+
+@main.route("/d/<base64_uuid:service_id>/<base64_uuid:document_id>/continue", methods=["GET"])
+def continue_to_document(service_id, document_id):
+    key = request.args.get("key")
+    if not key:
+        abort(404)
+
+    service, get_metadata = _get_service_and_document_metadata(service_id, document_id, key)
+
     try:
-        metadata = _get_document_metadata(service_id, document_id, key)
+        metadata = get_metadata()
     except (Gone, NotFound) as e:
         # pretty-up these particular errors with more context
+        service_contact_info = service["data"]["contact_link"]
         return render_template(
             "views/file-unavailable.html",
             status_code=e.code,
-            service_name=service_name,
+            service_name=service["data"]["name"],
             service_contact_info=service_contact_info,
-            contact_info_type=contact_info_type,
+            contact_info_type=assess_contact_type(service_contact_info),
         ), e.code
 
+    return redirect(_get_continue_url(service_id, document_id, key, service, metadata))
+
+
+def _get_continue_url(service_id, document_id, key, service, metadata):
     if "confirm_email" not in metadata:
         extra = {"service_id": service_id, "document_id": document_id, "metadata": metadata}
         current_app.logger.info(
@@ -81,22 +150,15 @@ def landing(service_id, document_id):
             extra=extra,
         )
 
-    if metadata.get("confirm_email", False) is True:
-        continue_url = url_for("main.confirm_email_address", service_id=service_id, document_id=document_id, key=key)
+    # pass on what we've checked so the next page doesn't need to check it again
+    verified = sign_verified_document(service_id, document_id, key, service, metadata)
 
-    else:
-        continue_url = url_for("main.download_document", service_id=service_id, document_id=document_id, key=key)
+    if metadata.get("confirm_email", False) is True:
+        return url_for(
+            "main.confirm_email_address", service_id=service_id, document_id=document_id, key=key, verified=verified
+        )
 
-    return render_template(
-        "views/landing.html",
-        service_id=service_id,
-        service_name=service_name,
-        service_contact_info=service_contact_info,
-        contact_info_type=contact_info_type,
-        document_id=document_id,
-        key=key,
-        continue_url=continue_url,
-    )
+    return url_for("main.download_document", service_id=service_id, document_id=document_id, key=key, verified=verified)
 
 
 @main.route("/d/<base64_uuid:service_id>/<base64_uuid:document_id>/confirm-email-address", methods=["GET", "POST"])
@@ -105,14 +167,14 @@ def confirm_email_address(service_id, document_id):
     if not key:
         abort(404)
 
-    service = _get_service_or_raise_error(service_id)
+    service, get_metadata = _get_service_and_document_metadata(service_id, document_id, key)
 
     service_name = service["data"]["name"]
     service_contact_info = service["data"]["contact_link"]
     contact_info_type = assess_contact_type(service_contact_info)
 
     try:
-        metadata = _get_document_metadata(service_id, document_id, key)
+        metadata = get_metadata()
     except (Gone, NotFound) as e:
         # pretty-up these particular errors with more context
         return render_template(
@@ -124,15 +186,24 @@ def confirm_email_address(service_id, document_id):
         ), e.code
 
     if metadata["confirm_email"] is False:
-        return redirect(url_for(".download_document", service_id=service_id, document_id=document_id, key=key))
+        return redirect(
+            url_for(
+                ".download_document",
+                service_id=service_id,
+                document_id=document_id,
+                key=key,
+                verified=request.args.get("verified"),
+            )
+        )
 
     form = EmailAddressForm()
 
     if form.validate_on_submit():
         try:
-            authentication_data = _authenticate_access_to_document(
-                service_id, document_id, key, form.email_address.data
-            )
+            with timed("authentication"):
+                authentication_data = _authenticate_access_to_document(
+                    service_id, document_id, key, form.email_address.data
+                )
 
         except TooManyRequests:
             return (
@@ -156,7 +227,15 @@ def confirm_email_address(service_id, document_id):
             cookie_domain = current_app.config["DOCUMENT_DOWNLOAD_API_HOST_NAME"].replace("https://download.", "")
             set_cookie_values["domain"] = cookie_domain
 
-            response = redirect(url_for(".download_document", service_id=service_id, document_id=document_id, key=key))
+            response = redirect(
+                url_for(
+                    ".download_document",
+                    service_id=service_id,
+                    document_id=document_id,
+                    key=key,
+                    verified=request.args.get("verified"),
+                )
+            )
             response.set_cookie(**set_cookie_values)
             return response
 
@@ -188,14 +267,14 @@ def download_document(service_id, document_id):
     if not key:
         abort(404)
 
-    service = _get_service_or_raise_error(service_id)
+    service, get_metadata = _get_service_and_document_metadata(service_id, document_id, key)
 
     service_name = service["data"]["name"]
     service_contact_info = service["data"]["contact_link"]
     contact_info_type = assess_contact_type(service_contact_info)
 
     try:
-        metadata = _get_document_metadata(service_id, document_id, key)
+        metadata = get_metadata()
     except (Gone, NotFound) as e:
         # pretty-up these particular errors with more context
         return render_template(
@@ -233,12 +312,59 @@ def _format_file_expiry_date(available_until: str) -> str:
 
 def _get_service_or_raise_error(service_id):
     try:
-        return service_api_client.get_service(service_id)
+        with timed("service"):
+            return service_api_client.get_service(service_id)
     except HTTPError as e:
         abort(e.status_code)
 
 
+def _get_service_and_document_metadata(service_id, document_id, key):
+    """
+    Get the document's metadata in the background while we get the service, so a page waits for the slower of the two
+    calls rather than both one after the other. If the landing page has passed on a token saying what it found, that's
+    used instead and neither API is called.
+
+    Errors getting the service take precedence. Otherwise returns the service, and a function that returns the
+    metadata (or raises any errors getting it).
+    """
+    if verified_document := load_verified_document(request.args.get("verified"), service_id, document_id, key):
+        service, metadata = verified_document
+        return service, lambda: metadata
+
+    metadata_call = BackgroundCall(_get_document_metadata, service_id, document_id, key)
+
+    try:
+        service = _get_service_or_raise_error(service_id)
+    except Exception:
+        # the metadata call isn't killed, as it may be making a call other requests are waiting on, but it's finished
+        # before this request is, rather than left running in a context copied from it
+        with suppress(Exception):
+            metadata_call.wait()
+        raise
+
+    return service, metadata_call.wait
+
+
 def _get_document_metadata(service_id, document_id, key):
+    with timed("metadata"):
+        return _get_document_metadata_or_cached_error(service_id, document_id, key)
+
+
+def _get_document_metadata_or_cached_error(service_id, document_id, key):
+    # remember links to documents that don't exist or have expired, so following them again doesn't cost a call to
+    # document-download-api
+    cache_key = document_link_fingerprint(service_id, document_id, key)
+    if unavailable_status_code := document_unavailable_cache.get(cache_key):
+        abort(unavailable_status_code)
+
+    try:
+        return _document_metadata_calls.do(cache_key, _fetch_document_metadata, service_id, document_id, key)
+    except (Gone, NotFound) as e:
+        document_unavailable_cache.set(cache_key, e.code)
+        raise
+
+
+def _fetch_document_metadata(service_id, document_id, key):
     check_file_url = "{}/services/{}/documents/{}/check?key={}".format(
         current_app.config["DOCUMENT_DOWNLOAD_API_HOST_NAME_INTERNAL"], service_id, document_id, key
     )
@@ -246,7 +372,10 @@ def _get_document_metadata(service_id, document_id, key):
     if has_request_context() and hasattr(request, "get_onwards_request_headers"):
         headers.update(request.get_onwards_request_headers())
 
-    response = requests.get(check_file_url, headers=headers)
+    if current_app.config["DOCUMENT_CHECK_HEDGING_ENABLED"]:
+        response = document_check_hedger.call(document_download_api.get, check_file_url, headers=headers)
+    else:
+        response = document_download_api.get(check_file_url, headers=headers)
 
     match response.status_code:
         case 400:
@@ -283,7 +412,7 @@ def _authenticate_access_to_document(service_id, document_id, key, email_address
     if has_request_context() and hasattr(request, "get_onwards_request_headers"):
         headers.update(request.get_onwards_request_headers())
 
-    response = requests.post(
+    response = document_download_api.post(
         auth_file_url,
         json={"key": key, "email_address": email_address},
         headers=headers,
@@ -1,9 +1,83 @@
-from flask import request
+import threading
+import time
+import urllib.parse
+
+from flask import current_app, request
 from flask.ctx import has_request_context
+from gds_metrics.metrics import Counter
+from notifications_python_client.authentication import create_jwt_token
 from notifications_python_client.notifications import NotificationsAPIClient
 
+from app.upstream.singleflight import SingleFlight
+from app.utils import BackgroundCall
+
+SERVICE_API_CLIENTS_CREATED = Counter(
+    "service_api_clients_created",
+    "ServiceApiClients created by the process, which should be one unless it is being recreated per request",
+)
+STALE_SERVICES_SERVED = Counter(
+    "stale_services_served",
+    "Services returned from the cache after they were due to be refreshed from notify-api",
+)
+
+# the only parts of a service used by our pages
+CACHED_SERVICE_FIELDS = ("name", "contact_link")
+
+# shared by every client in the process, so concurrent lookups of the same service make one call between them
+_get_service_calls = SingleFlight("get_service")
+
+
+class ReusableTokens:
+    """
+    Signs JWTs for notify-api, reusing each one until it is `max_age` seconds old rather than signing a new one for
+    every request.
+
+    notify-api rejects tokens issued more than 30 seconds before they arrive, so `max_age` must leave enough of that
+    for our clock being behind the API's.
+    """
+
+    def __init__(self, max_age, timer=time.time):
+        self.max_age = max_age
+        self._timer = timer
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def get(self, secret, client_id):
+        with self._lock:
+            token, signed_at = self._tokens.get((client_id, secret), (None, None))
+
+            if token is None or not 0 <= self._timer() - signed_at < self.max_age:
+                token = create_jwt_token(secret, client_id)
+                self._tokens[(client_id, secret)] = (token, self._timer())
+
+            return token
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+
+# shared by every client in the process
+admin_api_tokens = ReusableTokens(max_age=10)
+
 
 class OnwardsRequestNotificationsAPIClient(NotificationsAPIClient):
+    def _create_request_objects(self, url, data, params):
+        # the same as `BaseAPIClient._create_request_objects` in the notifications-python-client version pinned in
+        # requirements.in, but reusing a recently signed token
+        kwargs = {
+            "headers": self.generate_headers(admin_api_tokens.get(self.api_key, self.service_id)),
+            "timeout": self.timeout,
+        }
+
+        if data is not None:
+            kwargs.update(data=self._serialize_data(data))
+
+        if params is not None:
+            kwargs.update(params=params)
+
+        return urllib.parse.urljoin(str(self.base_url), str(url)), kwargs
+
     def generate_headers(self, api_token):
         headers = super().generate_headers(api_token)
 
@@ -17,7 +91,9 @@ class OnwardsRequestNotificationsAPIClient(NotificationsAPIClient):
 
 
 class ServiceApiClient:
-    def __init__(self, app):
+    def __init__(self, app, cache=None, upstream=None):
+        SERVICE_API_CLIENTS_CREATED.inc()
+
         self.api_client = OnwardsRequestNotificationsAPIClient(
             "x" * 100,
             base_url=app.config["API_HOST_NAME"],
@@ -26,9 +102,48 @@ class ServiceApiClient:
         # given it's designed for destructuring end-user api keys
         self.api_client.service_id = app.config["ADMIN_CLIENT_USER_NAME"]
         self.api_client.api_key = app.config["ADMIN_CLIENT_SECRET"]
+        if upstream is not None:
+            # send requests through the process's shared connection pool, timeouts and circuit breaker
+            self.api_client.request_session = upstream
+
+        self.cache = cache
+        if cache is not None:
+            self.fresh_for = app.config["SERVICE_CACHE_TTL_SECONDS"]
+            self.max_staleness = app.config["SERVICE_CACHE_MAX_STALENESS_SECONDS"]
 
     def get_service(self, service_id):
         """
-        Retrieve a service.
+        Retrieve a service, from `cache` if it has been fetched recently.
+
+        Once a cached service is older than `fresh_for` seconds it is still returned for up to `max_staleness` seconds
+        more, while it is fetched again in the background. This keeps pages fast, and working while notify-api is
+        having problems, as services' names and contact details hardly ever change.
         """
-        return self.api_client.get(f"/service/{service_id}")
+        if self.cache is None:
+            return _get_service_calls.do(str(service_id), self.api_client.get, f"/service/{service_id}")
+
+        cached = self.cache.get(str(service_id))
+        age = time.time() - cached["fetched_at"] if cached is not None else None
+
+        if cached is None or age >= self.fresh_for + self.max_staleness:
+            return _get_service_calls.do(str(service_id), self._get_and_cache_service, service_id)
+
+        if age >= self.fresh_for:
+            STALE_SERVICES_SERVED.inc()
+            if not _get_service_calls.in_flight(str(service_id)):
+                BackgroundCall(self._refresh_service, service_id)
+
+        return cached["service"]
+
+    def _get_and_cache_service(self, service_id):
+        service = self.api_client.get(f"/service/{service_id}")
+        # only what the pages show, as the cache may be on disk or shared with other apps
+        service = {"data": {field: service["data"][field] for field in CACHED_SERVICE_FIELDS}}
+        self.cache.set(str(service_id), {"service": service, "fetched_at": time.time()})
+        return service
+
+    def _refresh_service(self, service_id):
+        try:
+            _get_service_calls.do(str(service_id), self._get_and_cache_service, service_id)
+        except Exception as e:
+            current_app.logger.warning("Failed to refresh service %s, still using cached copy: %s", service_id, e)
@@ -0,0 +1,55 @@
+CSP_NONCE_ENVIRON_KEY = "document_download_frontend.csp_nonce"
+
+#  https://www.owasp.org/index.php/List_of_useful_HTTP_headers
+HEADERS = [
+    ("X-Robots-Tag", "noindex, nofollow"),
+    ("X-Frame-Options", "DENY"),
+    ("X-Content-Type-Options", "nosniff"),
+    ("X-Permitted-Cross-Domain-Policies", "none"),
+    ("Referrer-Policy", "no-referrer"),
+    ("Strict-Transport-Security", "max-age=31536000; includeSubDomains; preload"),
+    ("Cross-Origin-Embedder-Policy", "require-corp;"),
+    ("Cross-Origin-Opener-Policy", "same-origin;"),
+    ("Cross-Origin-Resource-Policy", "same-origin;"),
+    (
+        "Permissions-Policy",
+        "geolocation=(), microphone=(), camera=(), autoplay=(), payment=(), sync-xhr=()",
+    ),
+    ("Server", "Cloudfront"),
+]
+
+CONTENT_SECURITY_POLICY = (
+    "default-src 'self';"
+    "script-src 'self' 'nonce-{csp_nonce}';"
+    "connect-src 'self';"
+    "object-src 'self';"
+    "font-src 'self' data:;"
+    "img-src 'self' data:;"
+    "style-src 'self' 'nonce-{csp_nonce}';"
+    "frame-ancestors 'self';"
+    "frame-src 'self';"
+)
+
+
+class SecurityHeadersMiddleware:
+    """
+    Adds our security headers to every response from the app, in one go as it starts. The Content-Security-Policy
+    gets the nonce the request was given in `CSP_NONCE_ENVIRON_KEY`, if any.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self._headers = list(HEADERS)
+        # so the nonce can be put in with a single `join`
+        self._content_security_policy_parts = CONTENT_SECURITY_POLICY.split("{csp_nonce}")
+
+    def __call__(self, environ, start_response):
+        def start_response_with_security_headers(status, headers, exc_info=None):
+            content_security_policy = environ.get(CSP_NONCE_ENVIRON_KEY, "").join(self._content_security_policy_parts)
+            return start_response(
+                status,
+                [*headers, *self._headers, ("Content-Security-Policy", content_security_policy)],
+                exc_info,
+            )
+
+        return self.wsgi_app(environ, start_response_with_security_headers)
@@ -0,0 +1,139 @@
+import time
+from contextlib import contextmanager
+
+from flask import before_render_template, current_app, g, has_app_context, request, template_rendered
+from itsdangerous import BadData, URLSafeTimedSerializer
+
+DEBUG_TOKEN_HEADER = "X-Server-Timing-Token"
+
+_REQUEST_START_ENVIRON_KEY = "document_download_frontend.request_start"
+
+# the order and descriptions stages are reported in
+STAGES = {
+    "routing": "Request setup and routing",
+    "service": "Service lookup",
+    "metadata": "Document check",
+    "authentication": "Email address check",
+    "render": "Template rendering",
+    # security headers are added by `SecurityHeadersMiddleware`, after the Server-Timing header, so aren't included
+    "headers": "Cache-Control header",
+    "total": "Total",
+}
+
+
+class RequestStartMiddleware:
+    """
+    Notes when the app was handed the request, so that the time taken before the first `before_request` function
+    runs can be reported.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        environ[_REQUEST_START_ENVIRON_KEY] = time.perf_counter()
+        return self.wsgi_app(environ, start_response)
+
+
+def init_app(application):
+    """
+    Must be called before anything else registers `before_request` or `after_request` functions, so that timing
+    starts first and is reported last.
+    """
+    application.wsgi_app = RequestStartMiddleware(application.wsgi_app)
+    application.before_request(start_timing_before_request)
+    application.after_request(report_timings_after_request)
+    before_render_template.connect(_start_render, application)
+    template_rendered.connect(_end_render, application)
+
+
+def time_since_request_start():
+    """
+    Seconds since the app was handed the current request, or 0 if that wasn't noted.
+    """
+    if request_start := request.environ.get(_REQUEST_START_ENVIRON_KEY):
+        return time.perf_counter() - request_start
+    return 0
+
+
+def sign_debug_token():
+    """
+    A token that gets Server-Timing headers sent back when it's passed in the `X-Server-Timing-Token` header, without
+    turning them on for everyone.
+    """
+    return _serializer().dumps("server-timing")
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt="server-timing")
+
+
+def _has_valid_debug_token():
+    token = request.headers.get(DEBUG_TOKEN_HEADER)
+    if not token:
+        return False
+
+    try:
+        _serializer().loads(token, max_age=current_app.config["SERVER_TIMING_DEBUG_TOKEN_MAX_AGE_SECONDS"])
+    except BadData:
+        return False
+
+    return True
+
+
+def start_timing_before_request():
+    if not (current_app.config["SERVER_TIMING_ENABLED"] or _has_valid_debug_token()):
+        return
+
+    g.server_timings = {}
+    if request_start := request.environ.get(_REQUEST_START_ENVIRON_KEY):
+        g.server_timings["routing"] = time.perf_counter() - request_start
+
+
+@contextmanager
+def timed(stage):
+    """
+    Adds the time taken by the block to `stage` of the current request, if it's being timed.
+    """
+    timings = g.get("server_timings") if has_app_context() else None
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0) + time.perf_counter() - start
+
+
+def _start_render(sender, template, context, **extra):
+    if "server_timings" in g:
+        g.server_timing_render_start = time.perf_counter()
+
+
+def _end_render(sender, template, context, **extra):
+    if "server_timings" in g and "server_timing_render_start" in g:
+        g.server_timings["render"] = (
+            g.server_timings.get("render", 0) + time.perf_counter() - g.pop("server_timing_render_start")
+        )
+
+
+def report_timings_after_request(response):
+    timings = g.get("server_timings")
+    if timings is None:
+        return response
+
+    if request_start := request.environ.get(_REQUEST_START_ENVIRON_KEY):
+        timings["total"] = time.perf_counter() - request_start
+
+    timings_ms = {stage: round(timings[stage] * 1000, 1) for stage in STAGES if stage in timings}
+
+    response.headers["Server-Timing"] = ", ".join(
+        f'{stage};dur={duration};desc="{STAGES[stage]}"' for stage, duration in timings_ms.items()
+    )
+
+    extra = {"endpoint": request.endpoint, "server_timing_ms": timings_ms}
+    current_app.logger.info("Server timings for %(endpoint)s: %(server_timing_ms)s", extra, extra=extra)
+
+    return response
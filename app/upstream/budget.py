@@ -0,0 +1,32 @@
+import threading
+
+
+class RequestBudget:
+    """
+    Limits the extra requests (such as hedges or retries) we send to an upstream API to `ratio` of the requests we'd
+    send anyway, so that they can't multiply the load on it when it's struggling.
+
+    Every ordinary request adds `ratio` to the balance, up to `max_balance`, and every extra request needs 1 of it.
+    """
+
+    def __init__(self, ratio, max_balance):
+        self.ratio = ratio
+        self.max_balance = max_balance
+
+        self._lock = threading.Lock()
+        self._balance = max_balance
+
+    def deposit(self):
+        with self._lock:
+            self._balance = min(self.max_balance, self._balance + self.ratio)
+
+    def try_withdraw(self):
+        """
+        Returns whether an extra request can be sent, taking it out of the balance if so.
+        """
+        with self._lock:
+            if self._balance < 1:
+                return False
+
+            self._balance -= 1
+            return True
@@ -0,0 +1,82 @@
+import threading
+from contextlib import contextmanager
+
+import requests
+from gds_metrics.metrics import Counter, Gauge
+
+BULKHEAD_QUEUED = Gauge(
+    "upstream_bulkhead_queued",
+    "Requests to an upstream API waiting for one of the requests already in flight to finish",
+    ["upstream"],
+    multiprocess_mode="livesum",
+)
+BULKHEAD_REJECTIONS = Counter(
+    "upstream_bulkhead_rejections",
+    "Requests to an upstream API refused without being sent because too many were already in flight",
+    ["upstream", "reason"],
+)
+
+
+class BulkheadFull(requests.ConnectionError):
+    """
+    Raised instead of making a request to an upstream API that already has as many requests in flight and waiting as
+    it's allowed.
+
+    This is a `requests.ConnectionError` so that it's handled the same way as the upstream being unreachable.
+    """
+
+
+class Bulkhead:
+    """
+    Caps how many requests a worker process has in flight to one upstream API, so that if it slows down it can only
+    tie up that many greenlets, and calls to our other APIs carry on as normal.
+
+    Past `max_concurrent`, up to `max_queued` requests wait up to `max_wait` seconds for a request in flight to finish.
+    Any more are refused straight away.
+    """
+
+    def __init__(self, name, max_concurrent, max_queued, max_wait):
+        self.name = name
+        self.max_queued = max_queued
+        self.max_wait = max_wait
+
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._queued = 0
+
+        self._queued_metric = BULKHEAD_QUEUED.labels(name)
+        self._queued_metric.set(0)
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold one of the slots for requests in flight for the duration of the block, or raise `BulkheadFull`.
+        """
+        if not self._slots.acquire(blocking=False):
+            self._wait_for_slot()
+
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def _wait_for_slot(self):
+        with self._lock:
+            if self._queued >= self.max_queued:
+                BULKHEAD_REJECTIONS.labels(self.name, "queue_full").inc()
+                raise BulkheadFull(f"Too many requests to {self.name} in flight and waiting")
+            self._set_queued(self._queued + 1)
+
+        try:
+            acquired = self._slots.acquire(timeout=self.max_wait)
+        finally:
+            with self._lock:
+                self._set_queued(self._queued - 1)
+
+        if not acquired:
+            BULKHEAD_REJECTIONS.labels(self.name, "wait_timeout").inc()
+            raise BulkheadFull(f"Timed out waiting for a request to {self.name} to finish")
+
+    def _set_queued(self, queued):
+        self._queued = queued
+        self._queued_metric.set(queued)
@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import deque
+
+import requests
+from gds_metrics.metrics import Counter, Gauge
+
+CIRCUIT_BREAKER_STATE = Gauge(
+    "upstream_circuit_breaker_state",
+    "State of the circuit breaker for an upstream API: 0 closed, 1 half open, 2 open",
+    ["upstream"],
+    # each worker process has its own circuit breakers, so this is the most open of them
+    multiprocess_mode="livemax",
+)
+CIRCUIT_BREAKER_REJECTIONS = Counter(
+    "upstream_circuit_breaker_rejections",
+    "Requests to an upstream API refused without being sent because its circuit breaker was open",
+    ["upstream"],
+)
+
+
+class CircuitBreakerOpen(requests.ConnectionError):
+    """
+    Raised instead of making a request to an upstream API whose circuit breaker is open.
+
+    This is a `requests.ConnectionError` so that anything already handling an upstream being unreachable (such as
+    `NotificationsAPIClient`) handles it the same way.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stops us sending requests to an upstream API that is failing, so that greenlets fail fast rather than queueing up
+    behind one that is slow or down.
+
+    Once at least `minimum_calls` of the last `window_size` calls have been made and `failure_threshold` of them failed,
+    the breaker opens and requests are refused for `reset_timeout` seconds. After that it is half open: one trial
+    request is let through, closing the breaker again if it succeeds or reopening it if not.
+    """
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+    _STATE_METRIC_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name, failure_threshold, minimum_calls, window_size, reset_timeout, timer=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.minimum_calls = minimum_calls
+        self.reset_timeout = reset_timeout
+        self._timer = timer
+
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window_size)
+        self._failures = 0
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._trial_started_at = None
+
+        self._state_metric = CIRCUIT_BREAKER_STATE.labels(name)
+        self._rejections = CIRCUIT_BREAKER_REJECTIONS.labels(name)
+        self._state_metric.set(self._STATE_METRIC_VALUES[self.CLOSED])
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def before_call(self):
+        """
+        Raises `CircuitBreakerOpen` if a request shouldn't be sent right now.
+        """
+        with self._lock:
+            state = self._current_state()
+
+            if state == self.HALF_OPEN and self._trial_started_at is None:
+                self._trial_started_at = self._timer()
+                return
+
+            if state != self.CLOSED:
+                self._rejections.inc()
+                raise CircuitBreakerOpen(f"Circuit breaker for {self.name} is open")
+
+    def record_success(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._set_state(self.CLOSED)
+            else:
+                self._record_outcome(failed=False)
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._set_state(self.OPEN)
+                return
+
+            self._record_outcome(failed=True)
+            if (
+                self._state == self.CLOSED
+                and len(self._outcomes) >= self.minimum_calls
+                and self._failures / len(self._outcomes) >= self.failure_threshold
+            ):
+                self._set_state(self.OPEN)
+
+    def _record_outcome(self, failed):
+        if len(self._outcomes) == self._outcomes.maxlen:
+            self._failures -= self._outcomes[0]
+        self._outcomes.append(failed)
+        self._failures += failed
+
+    def _current_state(self):
+        now = self._timer()
+
+        if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+            self._set_state(self.HALF_OPEN)
+
+        # if a trial request never reported back (for example its greenlet was killed), allow another one
+        if (
+            self._state == self.HALF_OPEN
+            and self._trial_started_at is not None
+            and now - self._trial_started_at >= self.reset_timeout
+        ):
+            self._trial_started_at = None
+
+        return self._state
+
+    def _set_state(self, state):
+        self._state = state
+        self._trial_started_at = None
+
+        if state == self.OPEN:
+            self._opened_at = self._timer()
+        elif state == self.CLOSED:
+            self._outcomes.clear()
+            self._failures = 0
+
+        self._state_metric.set(self._STATE_METRIC_VALUES[state])
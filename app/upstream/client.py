@@ -0,0 +1,102 @@
+import re
+import time
+from urllib.parse import urlsplit
+
+import requests
+from gds_metrics.metrics import Histogram
+
+from app.upstream.deadline import DeadlineExceeded, limit_timeout
+
+UPSTREAM_REQUEST_DURATION = Histogram(
+    "upstream_request_duration_seconds",
+    "Time taken by requests to our upstream APIs, by the status class of their response (or `error` if there wasn't "
+    "one). Its count is the number of requests with each outcome",
+    ["upstream", "endpoint", "status_class"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf")),
+)
+
+_ID_IN_PATH = re.compile(r"/[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}(?=/|$|\.)", re.IGNORECASE)
+
+
+def endpoint_template(url):
+    """
+    The path of `url` with any IDs swapped for `<id>` and no query string, so it can be used as a metric label
+    without there being one per service or document.
+    """
+    return _ID_IN_PATH.sub("/<id>", urlsplit(url).path)
+
+
+class UpstreamClient:
+    """
+    Sends requests to one of our upstream APIs through the process's pooled session, with that API's timeouts (cut
+    short if they'd run past the current request's deadline), concurrency limit, circuit breaker and retry policy.
+
+    `request` takes the same arguments as `requests.Session.request`, so this can be used as the `request_session` of
+    a `NotificationsAPIClient`.
+    """
+
+    def __init__(self, name, session, connect_timeout, read_timeout, circuit_breaker, bulkhead, retry_policy):
+        self.name = name
+        self.session = session
+        self.timeout = (connect_timeout, read_timeout)
+        self.circuit_breaker = circuit_breaker
+        self.bulkhead = bulkhead
+        self.retry_policy = retry_policy
+
+    def request(self, method, url, **kwargs):
+        self.retry_policy.budget.deposit()
+
+        attempt = 1
+        while True:
+            try:
+                with self.bulkhead.slot():
+                    response = self._send(method, url, **kwargs)
+            except requests.ConnectionError as e:
+                if (delay := self.retry_policy.retry_delay(method, attempt, error=e)) is None:
+                    raise
+            else:
+                if (delay := self.retry_policy.retry_delay(method, attempt, response=response)) is None:
+                    return response
+
+            time.sleep(delay)
+            attempt += 1
+
+    def _send(self, method, url, **kwargs):
+        # after waiting for a slot, so any time spent waiting comes out of the timeouts
+        kwargs["timeout"], limited_by_deadline = limit_timeout(self.timeout)
+
+        self.circuit_breaker.before_call()
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.Timeout as e:
+            self._record_duration(url, "error", start)
+            if limited_by_deadline:
+                # not the API's fault - we didn't give it as long as usual
+                raise DeadlineExceeded(f"{self.name} did not respond before the request's deadline") from e
+            self.circuit_breaker.record_failure()
+            raise
+        except requests.RequestException:
+            self._record_duration(url, "error", start)
+            self.circuit_breaker.record_failure()
+            raise
+
+        self._record_duration(url, f"{response.status_code // 100}xx", start)
+
+        if response.status_code >= 500:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+
+        return response
+
+    def _record_duration(self, url, status_class, start):
+        UPSTREAM_REQUEST_DURATION.labels(self.name, endpoint_template(url), status_class).observe(
+            time.perf_counter() - start
+        )
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
@@ -0,0 +1,59 @@
+import time
+from contextvars import ContextVar
+
+from notifications_utils.eventlet import EventletTimeout
+
+
+class DeadlineExceeded(EventletTimeout):
+    """
+    Raised instead of waiting on an upstream call past the request's deadline. This is only about the request that
+    raised it, so it's not passed on to others sharing the call.
+    """
+
+
+# when the request being served will be given up on - copied into any `BackgroundCall`s it makes
+_deadline: ContextVar[float | None] = ContextVar("upstream_deadline", default=None)
+
+
+def set_deadline(seconds, timer=time.monotonic):
+    """
+    Give upstream calls made from now on in this context `seconds` to finish. Returns a token for `reset_deadline`.
+    """
+    return _deadline.set(timer() + seconds)
+
+
+def reset_deadline(token):
+    _deadline.reset(token)
+
+
+def time_remaining(timer=time.monotonic):
+    """
+    Seconds until the deadline, or None if there isn't one.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+
+    return deadline - timer()
+
+
+def limit_timeout(timeout, timer=time.monotonic):
+    """
+    Shortens a `(connect, read)` timeout so that it can't run past the deadline. Returns the timeout, and whether it
+    was shortened.
+
+    Raises `DeadlineExceeded` if the deadline has already passed, as the request will be killed before any call could
+    finish.
+    """
+    remaining = time_remaining(timer)
+    if remaining is None:
+        return timeout, False
+
+    if remaining <= 0:
+        raise DeadlineExceeded(f"Deadline passed {-remaining:.3f}s ago, not starting upstream call")
+
+    connect_timeout, read_timeout = timeout
+    if remaining >= max(connect_timeout, read_timeout):
+        return timeout, False
+
+    return (min(connect_timeout, remaining), min(read_timeout, remaining)), True
@@ -0,0 +1,187 @@
+import ipaddress
+import socket
+import threading
+import time
+
+import dns.exception
+import dns.resolver
+from gds_metrics.metrics import Counter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+
+from app.utils import BackgroundCall
+
+DNS_LOOKUPS = Counter(
+    "upstream_dns_lookups",
+    "DNS lookups of upstream hosts made by the process's DNS cache",
+    ["host", "result"],
+)
+DNS_CACHE_LOOKUPS = Counter(
+    "upstream_dns_cache_lookups",
+    "Addresses of upstream hosts wanted for new connections, by whether they were cached (`hit`), had to be looked up "
+    "(`miss`), or the lookup failed and expired addresses were used (`stale`)",
+    ["host", "result"],
+)
+
+
+def _resolve(host):
+    """
+    Returns the IP addresses of `host`, and how many seconds they can be cached for (or None if not known).
+    """
+    try:
+        answer = dns.resolver.resolve(host, "A", search=True)
+        return [record.address for record in answer], answer.rrset.ttl
+    except dns.exception.DNSException:
+        # for example the host's only in /etc/hosts, or only has an IPv6 address
+        addresses = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        return list(dict.fromkeys(address[4][0] for address in addresses)), None
+
+
+class DNSCache:
+    """
+    Remembers the addresses of our upstream hosts for as long as their DNS records say, so that opening a connection
+    to one doesn't usually have to wait for a DNS lookup.
+
+    Addresses are looked up again in the background once `refresh_after` of their TTL has passed. If a lookup fails
+    once they've expired, the expired addresses are used rather than failing the request.
+    """
+
+    def __init__(
+        self,
+        hosts,
+        default_ttl,
+        min_ttl,
+        max_ttl,
+        refresh_after=0.75,
+        resolve=_resolve,
+        timer=time.monotonic,
+    ):
+        self.hosts = {host for host in hosts if host and not self._is_ip_address(host)}
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.refresh_after = refresh_after
+        self._resolve = resolve
+        self._timer = timer
+
+        self._lock = threading.Lock()
+        # host -> (addresses, looked up at, ttl)
+        self._entries = {}
+        self._refreshing = set()
+
+    @staticmethod
+    def _is_ip_address(host):
+        try:
+            ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return True
+
+    def resolve(self, host):
+        """
+        Returns the addresses of `host`, or None if it's not one of the hosts we cache.
+        """
+        if host not in self.hosts:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(host)
+
+        if entry is None:
+            DNS_CACHE_LOOKUPS.labels(host, "miss").inc()
+            return self._lookup(host)
+
+        addresses, looked_up_at, ttl = entry
+        age = self._timer() - looked_up_at
+
+        if age >= ttl:
+            try:
+                addresses = self._lookup(host)
+            except OSError:
+                DNS_CACHE_LOOKUPS.labels(host, "stale").inc()
+                return addresses
+
+            DNS_CACHE_LOOKUPS.labels(host, "miss").inc()
+            return addresses
+
+        if age >= ttl * self.refresh_after:
+            self._refresh_in_background(host)
+
+        DNS_CACHE_LOOKUPS.labels(host, "hit").inc()
+        return addresses
+
+    def _lookup(self, host):
+        try:
+            addresses, ttl = self._resolve(host)
+        except OSError:
+            DNS_LOOKUPS.labels(host, "failure").inc()
+            raise
+
+        DNS_LOOKUPS.labels(host, "success").inc()
+        ttl = min(self.max_ttl, max(self.min_ttl, self.default_ttl if ttl is None else ttl))
+
+        with self._lock:
+            self._entries[host] = (addresses, self._timer(), ttl)
+
+        return addresses
+
+    def _refresh_in_background(self, host):
+        with self._lock:
+            if host in self._refreshing:
+                return
+            self._refreshing.add(host)
+
+        BackgroundCall(self._refresh, host)
+
+    def _refresh(self, host):
+        try:
+            self._lookup(host)
+        except OSError:
+            # we'll try again the next time a connection's opened
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(host)
+
+
+class _DNSCachingConnection:
+    dns_cache = None
+
+    def _new_conn(self):
+        try:
+            addresses = self.dns_cache.resolve(self._dns_host)
+        except OSError as e:
+            raise NameResolutionError(self.host, self, e) from e
+
+        if not addresses:
+            return super()._new_conn()
+
+        # connect to an address from the cache, but keep using the host name for the Host header, SNI and checking
+        # the certificate
+        host_name = self._dns_host
+        try:
+            for address in addresses:
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except (ConnectTimeoutError, NewConnectionError) as e:
+                    error = e
+            raise error
+        finally:
+            self._dns_host = host_name
+
+
+def dns_caching_pool_classes(dns_cache):
+    """
+    urllib3 connection pool classes that look up hosts' addresses in `dns_cache`, to use as a `PoolManager`'s
+    `pool_classes_by_scheme`.
+    """
+    attributes = {"dns_cache": dns_cache}
+    http_connection = type("DNSCachingHTTPConnection", (_DNSCachingConnection, HTTPConnection), attributes)
+    https_connection = type("DNSCachingHTTPSConnection", (_DNSCachingConnection, HTTPSConnection), attributes)
+
+    return {
+        "http": type("DNSCachingHTTPConnectionPool", (HTTPConnectionPool,), {"ConnectionCls": http_connection}),
+        "https": type("DNSCachingHTTPSConnectionPool", (HTTPSConnectionPool,), {"ConnectionCls": https_connection}),
+    }
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import deque
+
+from eventlet.queue import Empty, LightQueue
+from gds_metrics.metrics import Counter
+
+from app.utils import BackgroundCall
+
+HEDGED_CALLS = Counter(
+    "upstream_hedged_calls",
+    "Calls to an upstream API that could be hedged, by whether the first request answered in time (`not_needed`), a "
+    "second request was sent and which succeeded first (`primary_won` or `hedge_won`) or both failed (`both_failed`), "
+    "or the budget for second requests had run out (`budget_exhausted`)",
+    ["name", "outcome"],
+)
+
+
+class LatencyTracker:
+    """
+    Keeps the durations of the last `window_size` calls, to work out percentiles from. The durations are only sorted
+    again once `resort_every` more have been recorded, rather than for every percentile.
+    """
+
+    def __init__(self, window_size, min_samples, resort_every=50):
+        self.min_samples = min_samples
+        self.resort_every = resort_every
+        self._lock = threading.Lock()
+        self._durations = deque(maxlen=window_size)
+        self._sorted_durations = None
+        self._recorded_since_sort = 0
+
+    def record(self, duration):
+        with self._lock:
+            self._durations.append(duration)
+            self._recorded_since_sort += 1
+
+    def percentile(self, percentile):
+        """
+        Returns None until there have been `min_samples` calls.
+        """
+        with self._lock:
+            if len(self._durations) < self.min_samples:
+                return None
+            if self._sorted_durations is None or self._recorded_since_sort >= self.resort_every:
+                self._sorted_durations = sorted(self._durations)
+                self._recorded_since_sort = 0
+            durations = self._sorted_durations
+
+        return durations[min(len(durations) - 1, int(len(durations) * percentile / 100))]
+
+
+class Hedger:
+    """
+    Cuts the tail latency of an idempotent call: if it hasn't answered by the time `percentile` per cent of recent calls
+    had (and at least `min_delay` seconds), the same call is made again, and whichever succeeds first is used. A call
+    has failed if it raises an exception, or `is_failure` is true of what it returns. If both fail, the one that
+    finished last is used. The slower one is left to finish, and its result thrown away.
+
+    `budget` limits how many second calls are made.
+    """
+
+    def __init__(self, name, percentile, min_delay, budget, latencies, is_failure=lambda result: False):
+        self.name = name
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.budget = budget
+        self.latencies = latencies
+        self.is_failure = is_failure
+
+    def call(self, func, *args, **kwargs):
+        self.budget.deposit()
+        delay = self.latencies.percentile(self.percentile)
+
+        results = LightQueue()
+        BackgroundCall(self._attempt, results, "primary", func, args, kwargs)
+
+        if delay is None:
+            # there haven't been enough calls yet to know what's slow
+            return self._unpack(results.get())
+
+        try:
+            result = results.get(timeout=max(delay, self.min_delay))
+        except Empty:
+            pass
+        else:
+            HEDGED_CALLS.labels(self.name, "not_needed").inc()
+            return self._unpack(result)
+
+        if not self.budget.try_withdraw():
+            HEDGED_CALLS.labels(self.name, "budget_exhausted").inc()
+            return self._unpack(results.get())
+
+        BackgroundCall(self._attempt, results, "hedge", func, args, kwargs)
+        result = results.get()
+        if self._failed(result):
+            # the other call may still succeed
+            result = results.get()
+            outcome = "both_failed" if self._failed(result) else f"{result[0]}_won"
+        else:
+            outcome = f"{result[0]}_won"
+
+        HEDGED_CALLS.labels(self.name, outcome).inc()
+        return self._unpack(result)
+
+    def _failed(self, result):
+        _attempt, value, error = result
+        return error is not None or self.is_failure(value)
+
+    def _attempt(self, results, attempt, func, args, kwargs):
+        start = time.perf_counter()
+        try:
+            results.put((attempt, func(*args, **kwargs), None))
+        except Exception as e:
+            results.put((attempt, None, e))
+        finally:
+            # hedges are only made once the first call's slow, so would drag the percentile towards the delay
+            if attempt == "primary":
+                self.latencies.record(time.perf_counter() - start)
+
+    @staticmethod
+    def _unpack(result):
+        _attempt, value, error = result
+        if error is not None:
+            raise error
+        return value
@@ -0,0 +1,66 @@
+import random
+
+from gds_metrics.metrics import Counter
+
+from app.upstream.bulkhead import BulkheadFull
+from app.upstream.circuit_breaker import CircuitBreakerOpen
+from app.upstream.deadline import time_remaining
+
+UPSTREAM_RETRIES = Counter(
+    "upstream_retries",
+    "Failed requests to an upstream API that were retried, or that would have been if the retry budget hadn't run out",
+    ["upstream", "outcome"],
+)
+
+
+class RetryPolicy:
+    """
+    Decides whether a request to an upstream API that failed in a way that's likely to be transient (it couldn't
+    connect, or got a 502, 503 or 504) should be sent again, and how long to wait first.
+
+    Only idempotent requests are retried - never `POST`s such as `/authenticate`. Waits are a random amount up to an
+    exponentially increasing limit, so that retries from many greenlets don't all arrive together. Retries come out of
+    `budget`, which should be shared by every upstream in the process so that retries can't multiply the load when
+    things are going wrong.
+    """
+
+    RETRYABLE_METHODS = {"GET", "HEAD", "OPTIONS"}
+    RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+    def __init__(self, name, max_attempts, base_delay, max_delay, budget, random=random.random):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self._random = random
+
+    def backoff(self, attempt):
+        return self._random() * min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+    def retry_delay(self, method, attempt, response=None, error=None):
+        """
+        Returns how long to wait before sending the request again after `attempt` got `response` or `error`, or None
+        if it shouldn't be.
+        """
+        if method.upper() not in self.RETRYABLE_METHODS or attempt >= self.max_attempts:
+            return None
+
+        if error is not None and isinstance(error, CircuitBreakerOpen | BulkheadFull):
+            # we chose not to send it, so sending it again won't help
+            return None
+
+        if error is None and response.status_code not in self.RETRYABLE_STATUS_CODES:
+            return None
+
+        delay = self.backoff(attempt)
+        remaining = time_remaining()
+        if remaining is not None and delay >= remaining:
+            return None
+
+        if not self.budget.try_withdraw():
+            UPSTREAM_RETRIES.labels(self.name, "budget_exhausted").inc()
+            return None
+
+        UPSTREAM_RETRIES.labels(self.name, "retried").inc()
+        return delay
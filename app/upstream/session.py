@@ -0,0 +1,58 @@
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from gds_metrics.metrics import Gauge
+from requests.adapters import HTTPAdapter
+
+from app.upstream.dns import dns_caching_pool_classes
+
+UPSTREAM_POOL_CONNECTIONS = Gauge(
+    "upstream_pool_connections_created",
+    "Connections opened to an upstream host by the process's connection pool",
+    ["host"],
+    multiprocess_mode="livesum",
+)
+UPSTREAM_POOL_REQUESTS = Gauge(
+    "upstream_pool_requests",
+    "Requests sent to an upstream host through the process's connection pool",
+    ["host"],
+    multiprocess_mode="livesum",
+)
+
+
+class PooledSession(requests.Session):
+    """
+    A `requests.Session` shared by every greenlet in a worker process, so that calls to our upstream APIs reuse
+    keep-alive connections instead of opening a new TCP and TLS connection for each page view.
+    """
+
+    def __init__(self, pool_maxsize, pool_connections=10, dns_cache=None):
+        super().__init__()
+
+        # `pool_maxsize` is the number of idle connections kept per host - anything above it is still allowed
+        # (`pool_block=False`), but is closed when returned rather than kept alive
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=False)
+        if dns_cache is not None:
+            self.adapter.poolmanager.pool_classes_by_scheme = dns_caching_pool_classes(dns_cache)
+        self.mount("http://", self.adapter)
+        self.mount("https://", self.adapter)
+
+        # the session is shared between every user of the worker, so must never send cookies set by one response
+        # on a later request
+        self.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+        self.hooks["response"].append(self._record_pool_metrics)
+
+    def pool_stats(self, url):
+        pool = self.adapter.poolmanager.connection_from_url(url)
+        return {
+            "host": pool.host,
+            "connections_created": pool.num_connections,
+            "requests": pool.num_requests,
+        }
+
+    def _record_pool_metrics(self, response, *args, **kwargs):
+        stats = self.pool_stats(response.url)
+
+        UPSTREAM_POOL_CONNECTIONS.labels(stats["host"]).set(stats["connections_created"])
+        UPSTREAM_POOL_REQUESTS.labels(stats["host"]).set(stats["requests"])
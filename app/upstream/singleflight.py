@@ -0,0 +1,84 @@
+import threading
+
+from gds_metrics.metrics import Counter
+
+from app.upstream.deadline import DeadlineExceeded
+
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_calls",
+    "Calls made through a single-flight group, by whether they made the call or shared one already in flight",
+    ["group", "role"],
+)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.followers = 0
+        self.result = None
+        self.error = None
+        # the leader didn't finish the call, so there's nothing to share
+        self.abandoned = False
+
+
+class SingleFlight:
+    """
+    Folds concurrent calls for the same key into one. The first caller makes the call, and anyone asking for the same
+    key before it finishes waits and gets the same result (or has the same exception raised). If the caller making the
+    call is killed, or gives up because its own request's deadline has passed, those waiting try again instead, and one
+    of them makes the call.
+
+    Under the eventlet worker hundreds of greenlets can ask for the same service or document at once, for example
+    when recipients of a bulk send follow their links at the same time.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._leaders = SINGLEFLIGHT_CALLS.labels(name, "leader")
+        self._followers = SINGLEFLIGHT_CALLS.labels(name, "follower")
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, func, *args, **kwargs):
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                is_leader = call is None
+                if is_leader:
+                    call = self._calls[key] = _Call()
+                else:
+                    call.followers += 1
+
+            if is_leader:
+                break
+
+            self._followers.inc()
+            call.done.wait()
+            if call.abandoned:
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        self._leaders.inc()
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except DeadlineExceeded:
+            call.abandoned = True
+            raise
+        except Exception as e:
+            call.error = e
+            raise
+        except BaseException:
+            # for example `GreenletExit` - the leader's been killed, not the call failed
+            call.abandoned = True
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
@@ -1,6 +1,9 @@
+import contextvars
+import hashlib
 import re
 from datetime import date
 
+import eventlet
 from dateutil import parser
 from notifications_utils.recipient_validation.email_address import EMAIL_REGEX_PATTERN
 
@@ -23,3 +26,39 @@ def document_has_expired(available_until):
         return True
 
     return False
+
+
+def document_link_fingerprint(service_id, document_id, key):
+    """
+    Identifies a link to a document without holding on to its key. Because the key is hashed in, an incorrect key can
+    never be mistaken for the right one.
+    """
+    return f"{service_id}/{document_id}/{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+class BackgroundCall:
+    """
+    Calls `func` in a new green thread, in a copy of the current context so that it can still use the app and
+    request. Under the eventlet worker this lets a view wait on several upstream calls at the same time.
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        self._green_thread = eventlet.spawn(contextvars.copy_context().run, self._call, func, args, kwargs)
+
+    @staticmethod
+    def _call(func, args, kwargs):
+        # return exceptions rather than raising them, so the hub doesn't print tracebacks for expected errors (such as
+        # a 404 abort) - they're raised by `wait` instead
+        try:
+            return func(*args, **kwargs), None
+        except Exception as e:
+            return None, e
+
+    def wait(self):
+        """
+        Wait for the call to finish, returning its result or raising its exception.
+        """
+        result, error = self._green_thread.wait()
+        if error is not None:
+            raise error
+        return result
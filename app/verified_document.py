@@ -0,0 +1,48 @@
+from flask import current_app
+from itsdangerous import BadData, URLSafeTimedSerializer
+
+from app.utils import document_has_expired, document_link_fingerprint
+
+# the parts of the document's metadata that the pages after the landing page use
+METADATA_FIELDS = ("direct_file_url", "confirm_email", "size_in_bytes", "file_extension", "available_until")
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt="verified-document")
+
+
+def sign_verified_document(service_id, document_id, key, service, metadata):
+    """
+    Sign the service and document metadata the landing page has just checked, so the pages the recipient goes on to
+    can use them instead of asking notify-api and document-download-api again.
+    """
+    return _serializer().dumps(
+        {
+            "document": document_link_fingerprint(service_id, document_id, key),
+            "service": {"name": service["data"]["name"], "contact_link": service["data"]["contact_link"]},
+            "metadata": {field: metadata.get(field) for field in METADATA_FIELDS},
+        }
+    )
+
+
+def load_verified_document(token, service_id, document_id, key):
+    """
+    Returns the service and metadata signed into `token`, or None if there's no token, or it's been tampered with,
+    has expired or was signed for a different link.
+    """
+    if not token:
+        return None
+
+    try:
+        data = _serializer().loads(token, max_age=current_app.config["VERIFIED_DOCUMENT_MAX_AGE_SECONDS"])
+    except BadData:
+        return None
+
+    if data.get("document") != document_link_fingerprint(service_id, document_id, key):
+        return None
+
+    metadata = data["metadata"]
+    if metadata["available_until"] and document_has_expired(metadata["available_until"]):
+        return None
+
+    return {"data": data["service"]}, metadata
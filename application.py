@@ -25,5 +25,5 @@ application.wsgi_app = WhiteNoise(application.wsgi_app, STATIC_ROOT, STATIC_URL)
 if using_eventlet:
     application.wsgi_app = EventletTimeoutMiddleware(
         application.wsgi_app,
-        timeout_seconds=int(os.getenv("HTTP_SERVE_TIMEOUT_SECONDS", 30)),
+        timeout_seconds=application.config["HTTP_SERVE_TIMEOUT_SECONDS"],
     )
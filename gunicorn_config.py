@@ -7,6 +7,6 @@ set_gunicorn_defaults(globals())
 
 workers = 10
 worker_class = "eventlet"
-worker_connections = 1000
+worker_connections = int(os.getenv("WORKER_CONNECTIONS", 1000))  # also sizes the upstream connection pool
 keepalive = 90
 timeout = int(os.getenv("HTTP_SERVE_TIMEOUT_SECONDS", 30))  # though has little effect with eventlet worker_class
@@ -1,7 +1,9 @@
 import re
 from datetime import date, timedelta
 from unittest.mock import Mock
+from urllib.parse import parse_qs, urlsplit
 
+import eventlet
 import pytest
 from bs4 import BeautifulSoup
 from flask import current_app, url_for
@@ -9,7 +11,9 @@ from freezegun import freeze_time
 from notifications_python_client.errors import HTTPError
 from notifications_utils.base64_uuid import uuid_to_base64
 from notifications_utils.testing.comparisons import AnySupersetOf
+from werkzeug.exceptions import Gone
 
+from app import get_document_check_hedger
 from tests import normalize_spaces
 
 
@@ -55,6 +59,7 @@ def test_services_view_redirects_to_api(client, url):
     "view, method",
     [
         ("main.landing", "get"),
+        ("main.continue_to_document", "get"),
         ("main.download_document", "get"),
         ("main.confirm_email_address", "get"),
         ("main.confirm_email_address", "post"),
@@ -75,6 +80,28 @@ def test_404_if_no_key_in_query_string(service_id, document_id, view, method, cl
     assert normalize_spaces(page.h1.text) == "Page not found"
 
 
+def test_document_check_is_finished_before_responding_if_getting_the_service_fails(
+    service_id, document_id, key, client, mocker, rmock, sample_service, document_has_metadata_no_confirmation
+):
+    mock_get_service = mocker.patch(
+        "app.service_api_client.get_service", side_effect=HTTPError(response=Mock(status_code=404))
+    )
+
+    response = client.get(url_for("main.download_document", service_id=service_id, document_id=document_id, key=key))
+
+    assert response.status_code == 404
+    assert len(rmock.request_history) == 1
+
+    # and it doesn't go on to run during the next request
+    mock_get_service.side_effect = None
+    mock_get_service.return_value = {"data": sample_service}
+
+    response = client.get(url_for("main.continue_to_document", service_id=service_id, document_id=document_id, key=key))
+
+    assert response.status_code == 302
+    assert len(rmock.request_history) == 2
+
+
 @pytest.mark.parametrize(
     "view, method",
     [
@@ -105,6 +132,73 @@ def test_notifications_api_error(view, method, service_id, document_id, client,
         ("main.confirm_email_address", "post"),
     ],
 )
+def test_notifications_api_error_takes_precedence_over_document_error(
+    view, method, service_id, document_id, client, mocker
+):
+    mocker.patch("app.service_api_client.get_service", side_effect=HTTPError(response=Mock(status_code=403)))
+    mocker.patch("app.main.views.index._get_document_metadata", side_effect=Gone)
+
+    response = client.open(
+        url_for(view, service_id=service_id, document_id=document_id, key="1234"),
+        method=method,
+    )
+
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize(
+    "view, method",
+    [
+        ("main.landing", "get"),
+        ("main.download_document", "get"),
+        ("main.confirm_email_address", "get"),
+    ],
+)
+def test_service_and_document_metadata_are_fetched_at_the_same_time(
+    view, method, service_id, document_id, client, mocker, sample_service
+):
+    events = []
+
+    def _get_service(service_id):
+        events.append("service started")
+        eventlet.sleep(0.01)
+        events.append("service finished")
+        return {"data": sample_service}
+
+    def _get_document_metadata(service_id, document_id, key):
+        events.append("metadata started")
+        eventlet.sleep(0.01)
+        events.append("metadata finished")
+        return {
+            "direct_file_url": "url",
+            "confirm_email": True,
+            "size_in_bytes": 712099,
+            "file_extension": "txt",
+            "available_until": None,
+        }
+
+    mocker.patch("app.service_api_client.get_service", side_effect=_get_service)
+    mocker.patch("app.main.views.index._get_document_metadata", side_effect=_get_document_metadata)
+
+    response = client.open(
+        url_for(view, service_id=service_id, document_id=document_id, key="1234"),
+        method=method,
+    )
+
+    assert response.status_code == 200
+    assert events.index("metadata started") < events.index("service finished")
+
+
+@pytest.mark.parametrize(
+    "view, method",
+    [
+        ("main.landing", "get"),
+        ("main.continue_to_document", "get"),
+        ("main.download_document", "get"),
+        ("main.confirm_email_address", "get"),
+        ("main.confirm_email_address", "post"),
+    ],
+)
 def test_when_document_is_unavailable(
     view, method, service_id, document_id, key, client, sample_service, rmock, mocker
 ):
@@ -291,6 +385,74 @@ def test_download_document_returns_file_unavailable_if_file_past_expiry_date_old
     assert rmock.request_history[0].headers == AnySupersetOf({"some-onwards": "request-header"})
 
 
+@pytest.mark.parametrize("view", ("main.landing", "main.confirm_email_address", "main.download_document"))
+@pytest.mark.parametrize(
+    "api_status_code, expected_status_code",
+    [
+        (404, 404),
+        (410, 410),
+    ],
+)
+def test_unavailable_document_is_remembered(
+    service_id, document_id, key, client, sample_service, view, rmock, mocker, api_status_code, expected_status_code
+):
+    mocker.patch("app.service_api_client.get_service", return_value={"data": sample_service})
+
+    rmock.get(
+        "{}/services/{}/documents/{}/check?key={}".format(
+            current_app.config["DOCUMENT_DOWNLOAD_API_HOST_NAME_INTERNAL"], service_id, document_id, key
+        ),
+        status_code=api_status_code,
+        json={"Error": "Nope"},
+    )
+
+    for _ in range(3):
+        response = client.get(url_for(view, service_id=service_id, document_id=document_id, key=key))
+
+        assert response.status_code == expected_status_code
+        page = BeautifulSoup(response.data.decode("utf-8"), "html.parser")
+        # ensure this is still our contextualized page
+        assert any((sample_service["name"] in elem.text) for elem in page.select("main p, main a"))
+
+    assert len(rmock.request_history) == 1
+
+
+def test_unavailable_document_is_only_remembered_for_the_key_used(
+    service_id, document_id, client, sample_service, rmock, mocker
+):
+    mocker.patch("app.service_api_client.get_service", return_value={"data": sample_service})
+
+    rmock.get(
+        "{}/services/{}/documents/{}/check?key={}".format(
+            current_app.config["DOCUMENT_DOWNLOAD_API_HOST_NAME_INTERNAL"], service_id, document_id, "wrong-key"
+        ),
+        status_code=404,
+        json={"Error": "Nope"},
+    )
+    rmock.get(
+        "{}/services/{}/documents/{}/check?key={}".format(
+            current_app.config["DOCUMENT_DOWNLOAD_API_HOST_NAME_INTERNAL"], service_id, document_id, "right-key"
+        ),
+        json={
+            "document": {
+                "direct_file_url": "url",
+                "confirm_email": False,
+                "size_in_bytes": 712099,
+                "file_extension": "txt",
+                "available_until": str(date.today() + timedelta(days=5)),
+            }
+        },
+    )
+
+    response = client.get(url_for("main.landing", service_id=service_id, document_id=document_id, key="wrong-key"))
+    assert response.status_code == 404
+
+    response = client.get(url_for("main.landing", service_id=service_id, document_id=document_id, key="right-key"))
+    assert response.status_code == 200
+
+    assert len(rmock.request_history) == 2
+
+
 @pytest.mark.parametrize("view", ("main.landing", "main.confirm_email_address", "main.download_document"))
 def test_download_document_succeeds_if_missing_available_until(
     service_id, document_id, key, client, sample_service, view, rmock, mocker
@@ -422,8 +584,8 @@ def test_landing_page_creates_link_for_document(
     page = BeautifulSoup(response.data.decode("utf-8"), "html.parser")
     assert normalize_spaces(page.title.text) == "You have a file to download – GOV.UK"
     assert normalize_spaces(page.h1.text) == "You have a file to download"
-    assert page.find("a", string=re.compile("Continue"))["href"] == url_for(
-        "main.download_document", service_id=service_id, document_id=document_id, key="1234"
+    assert page.find("a", string=re.compile("Continue"))["href"].startswith(
+        url_for("main.download_document", service_id=service_id, document_id=document_id, key="1234") + "&verified="
     )
 
 
@@ -445,8 +607,187 @@ def test_landing_page_creates_link_to_confirm_email_address(
     page = BeautifulSoup(response.data.decode("utf-8"), "html.parser")
     assert normalize_spaces(page.title.text) == "You have a file to download – GOV.UK"
     assert normalize_spaces(page.h1.text) == "You have a file to download"
+    assert page.find("a", string=re.compile("Continue"))["href"].startswith(
+        url_for("main.confirm_email_address", service_id=service_id, document_id=document_id, key="1234") + "&verified="
+    )
+
+
+def test_document_check_can_be_hedged(
+    app_, service_id, document_id, key, document_has_metadata_no_confirmation, client, mocker, sample_service
+):
+    app_.config["DOCUMENT_CHECK_HEDGING_ENABLED"] = True
+    mocker.patch("app.service_api_client.get_service", return_value={"data": sample_service})
+    mock_hedged_call = mocker.spy(get_document_check_hedger(), "call")
+
+    response = client.get(url_for("main.landing", service_id=service_id, document_id=document_id, key=key))
+
+    assert response.status_code == 200
+    assert mock_hedged_call.call_args.args[1] == "{}/services/{}/documents/{}/check?key={}".format(
+        current_app.config["DOCUMENT_DOWNLOAD_API_HOST_NAME_INTERNAL"], service_id, document_id, key
+    )
+
+
+def test_landing_page_with_lazy_document_check_does_not_check_document(
+    app_, service_id, document_id, key, client, mocker, rmock, sample_service
+):
+    app_.config["LAZY_DOCUMENT_CHECK"] = True
+    mocker.patch("app.service_api_client.get_service", return_value={"data": sample_service})
+
+    response = client.get(url_for("main.landing", service_id=service_id, document_id=document_id, key=key))
+
+    assert response.status_code == 200
+    page = BeautifulSoup(response.data.decode("utf-8"), "html.parser")
+    assert normalize_spaces(page.h1.text) == "You have a file to download"
     assert page.find("a", string=re.compile("Continue"))["href"] == url_for(
-        "main.confirm_email_address", service_id=service_id, document_id=document_id, key="1234"
+        "main.continue_to_document", service_id=service_id, document_id=document_id, key=key
+    )
+    assert rmock.called is False
+
+
+@pytest.mark.parametrize(
+    "metadata_fixture, expected_view",
+    [
+        ("document_has_metadata_no_confirmation", "main.download_document"),
+        ("document_has_metadata_requires_confirmation", "main.confirm_email_address"),
+    ],
+)
+def test_continue_to_document_checks_document_and_redirects(
+    request, service_id, document_id, key, client, mocker, rmock, sample_service, metadata_fixture, expected_view
+):
+    request.getfixturevalue(metadata_fixture)
+    mocker.patch("app.service_api_client.get_service", return_value={"data": sample_service})
+
+    response = client.get(url_for("main.continue_to_document", service_id=service_id, document_id=document_id, key=key))
+
+    assert response.status_code == 302
+    assert response.location.startswith(
+        url_for(expected_view, service_id=service_id, document_id=document_id, key=key) + "&verified="
+    )
+    assert len(rmock.request_history) == 1
+
+    # the page it goes on to doesn't need to check the document again
+    response = client.get(response.location)
+
+    assert response.status_code == 200
+    assert len(rmock.request_history) == 1
+
+
+@pytest.mark.parametrize(
+    "headers, environ_base, expected_reason",
+    [
+        ({"User-Agent": "Mozilla/5.0 (compatible; SafeLinks-Scanner/1.0)"}, {}, "user_agent"),
+        ({}, {"REMOTE_ADDR": "203.0.113.7"}, "ip_range"),
+        ({"X-Forwarded-For": "10.0.0.1, 203.0.113.7"}, {}, "ip_range"),
+        ({"Sec-Purpose": "prefetch"}, {}, "prefetch_header"),
+    ],
+)
+def test_landing_page_answers_link_scanners_without_calling_apis(
+    app_, service_id, document_id, key, client, mocker, rmock, headers, environ_base, expected_reason
+):
+    app_.config["LINK_SCANNER_USER_AGENTS"] = ["safelinks", "mimecast"]
+    app_.config["LINK_SCANNER_IP_RANGES"] = ["203.0.113.0/24"]
+    app_.config["LINK_SCANNER_PREFETCH_HEADERS"] = ["Sec-Purpose: prefetch"]
+    mock_get_service = mocker.patch("app.service_api_client.get_service")
+    mock_diverted = mocker.patch("app.main.views.index.LINK_SCANNER_REQUESTS_DIVERTED")
+
+    response = client.get(
+        url_for("main.landing", service_id=service_id, document_id=document_id, key=key),
+        headers=headers,
+        environ_base=environ_base,
+    )
+
+    assert response.status_code == 200
+    page = BeautifulSoup(response.data.decode("utf-8"), "html.parser")
+    assert normalize_spaces(page.h1.text) == "You have a file to download"
+    assert "open the link in the email in your web browser" in normalize_spaces(page.main.text)
+    assert mock_get_service.called is False
+    assert rmock.called is False
+    mock_diverted.labels.assert_called_once_with(expected_reason)
+    mock_diverted.labels.return_value.inc.assert_called_once_with()
+
+
+def test_landing_page_does_not_divert_requests_if_link_scanners_not_configured(
+    service_id, document_id, key, document_has_metadata_no_confirmation, client, mocker, sample_service
+):
+    mocker.patch("app.service_api_client.get_service", return_value={"data": sample_service})
+    mock_diverted = mocker.patch("app.main.views.index.LINK_SCANNER_REQUESTS_DIVERTED")
+
+    response = client.get(
+        url_for("main.landing", service_id=service_id, document_id=document_id, key=key),
+        headers={"User-Agent": "Mozilla/5.0 (compatible; SafeLinks-Scanner/1.0)", "Sec-Purpose": "prefetch"},
+    )
+
+    assert response.status_code == 200
+    page = BeautifulSoup(response.data.decode("utf-8"), "html.parser")
+    assert page.find("a", string=re.compile("Continue"))
+    assert mock_diverted.labels.called is False
+
+
+@pytest.mark.parametrize("view", ["main.download_document", "main.confirm_email_address"])
+def test_pages_after_landing_page_use_what_it_verified(
+    service_id,
+    document_id,
+    key,
+    document_has_metadata_requires_confirmation,
+    client,
+    mocker,
+    sample_service,
+    rmock,
+    view,
+):
+    mock_get_service = mocker.patch("app.service_api_client.get_service", return_value={"data": sample_service})
+
+    response = client.get(url_for("main.landing", service_id=service_id, document_id=document_id, key=key))
+    page = BeautifulSoup(response.data.decode("utf-8"), "html.parser")
+    continue_url = page.find("a", string=re.compile("Continue"))["href"]
+    verified = parse_qs(urlsplit(continue_url).query)["verified"][0]
+
+    response = client.get(url_for(view, service_id=service_id, document_id=document_id, key=key, verified=verified))
+
+    assert response.status_code == 200
+    page = BeautifulSoup(response.data.decode("utf-8"), "html.parser")
+    assert "Sample Service" in normalize_spaces(page.select_one("main").text)
+    assert mock_get_service.call_count == 1
+    assert len(rmock.request_history) == 1
+
+
+@pytest.mark.parametrize("verified", ["not-a-real-token", None])
+def test_download_document_checks_document_without_valid_verified_token(
+    service_id, document_id, key, document_has_metadata_no_confirmation, client, mocker, sample_service, rmock, verified
+):
+    mock_get_service = mocker.patch("app.service_api_client.get_service", return_value={"data": sample_service})
+
+    response = client.get(
+        url_for("main.download_document", service_id=service_id, document_id=document_id, key=key, verified=verified)
+    )
+
+    assert response.status_code == 200
+    assert mock_get_service.call_count == 1
+    assert len(rmock.request_history) == 1
+
+
+def test_confirm_email_address_passes_verified_token_on_to_download_page(
+    service_id, document_id, key, document_has_metadata_no_confirmation, client, mocker, sample_service
+):
+    mocker.patch("app.service_api_client.get_service", return_value={"data": sample_service})
+
+    response = client.get(
+        url_for(
+            "main.confirm_email_address",
+            service_id=service_id,
+            document_id=document_id,
+            key=key,
+            verified="some-token",
+        )
+    )
+
+    assert response.status_code == 302
+    assert response.location == url_for(
+        "main.download_document",
+        service_id=service_id,
+        document_id=document_id,
+        key=key,
+        verified="some-token",
     )
 
 
@@ -1,8 +1,19 @@
 from unittest import mock
+from uuid import uuid4
 
+import pytest
+import requests_mock
+from flask import request
+from freezegun import freeze_time
+from notifications_python_client.base import BaseAPIClient
+from notifications_python_client.errors import HTTPError
 from notifications_utils.testing.comparisons import AnySupersetOf
 
-from app.notify_client.service_api_client import ServiceApiClient
+from app import get_notify_api, get_service_api_client, reset_memos
+from app.caching import LocalCache
+from app.notify_client.service_api_client import ReusableTokens, ServiceApiClient, admin_api_tokens
+from app.upstream.circuit_breaker import CircuitBreakerOpen
+from app.utils import BackgroundCall
 
 
 def test_client_gets_service(mocker):
@@ -55,3 +66,246 @@ def test_client_no_onward_headers(app_, rmock, service_id, sample_service):
     client.get_service(service_id)
 
     assert len(rmock.request_history) == 1
+
+
+def test_client_caches_service(app_, rmock, service_id, sample_service):
+    client = ServiceApiClient(app_, cache=LocalCache("service", maxsize=10, ttl=60))
+
+    rmock.get(
+        "{}/service/{}".format(
+            app_.config["API_HOST_NAME"],
+            service_id,
+        ),
+        status_code=200,
+        json={"data": sample_service},
+    )
+
+    assert client.get_service(service_id) == {"data": sample_service}
+    assert client.get_service(service_id) == {"data": sample_service}
+
+    assert len(rmock.request_history) == 1
+
+
+def test_client_only_caches_the_fields_pages_use(app_, rmock, service_id, sample_service):
+    cache = LocalCache("service", maxsize=10, ttl=60)
+    client = ServiceApiClient(app_, cache=cache)
+
+    rmock.get(
+        "{}/service/{}".format(app_.config["API_HOST_NAME"], service_id),
+        json={"data": {**sample_service, "email_from": "sample.service", "permissions": ["email"]}},
+    )
+
+    assert client.get_service(service_id) == {"data": sample_service}
+    assert cache.get(str(service_id))["service"] == {"data": sample_service}
+
+
+def test_client_does_not_cache_errors(app_, rmock, service_id):
+    client = ServiceApiClient(app_, cache=LocalCache("service", maxsize=10, ttl=60))
+
+    rmock.get(
+        "{}/service/{}".format(
+            app_.config["API_HOST_NAME"],
+            service_id,
+        ),
+        status_code=500,
+    )
+
+    with pytest.raises(HTTPError):
+        client.get_service(service_id)
+    with pytest.raises(HTTPError):
+        client.get_service(service_id)
+
+    assert len(rmock.request_history) == 2
+
+
+def test_client_sends_requests_through_upstream_client(app_, rmock, service_id, sample_service):
+    client = ServiceApiClient(app_, upstream=get_notify_api())
+
+    rmock.get(
+        "{}/service/{}".format(
+            app_.config["API_HOST_NAME"],
+            service_id,
+        ),
+        status_code=200,
+        json={"data": sample_service},
+    )
+
+    client.get_service(service_id)
+
+    assert rmock.request_history[0].timeout == (
+        app_.config["NOTIFY_API_CONNECT_TIMEOUT_SECONDS"],
+        app_.config["NOTIFY_API_READ_TIMEOUT_SECONDS"],
+    )
+
+
+def test_client_raises_503_when_circuit_breaker_is_open(app_, rmock, service_id, mocker):
+    client = ServiceApiClient(app_, upstream=get_notify_api())
+    mocker.patch.object(get_notify_api().circuit_breaker, "before_call", side_effect=CircuitBreakerOpen)
+
+    with pytest.raises(HTTPError) as exc:
+        client.get_service(service_id)
+
+    assert exc.value.status_code == 503
+    assert len(rmock.request_history) == 0
+
+
+@pytest.fixture
+def stale_while_revalidate_client(app_, mocker):
+    # run background refreshes straight away so we can see what they did
+    mocker.patch(
+        "app.notify_client.service_api_client.BackgroundCall",
+        side_effect=lambda func, *args: func(*args),
+    )
+    app_.config["SERVICE_CACHE_TTL_SECONDS"] = 60
+    app_.config["SERVICE_CACHE_MAX_STALENESS_SECONDS"] = 600
+    return ServiceApiClient(app_, cache=LocalCache("service", maxsize=10, ttl=660))
+
+
+@pytest.mark.parametrize(
+    "time_of_second_call, expected_services, expected_requests",
+    [
+        # fresh, so comes from the cache
+        ("2026-01-01 12:00:59", ["old", "old"], 1),
+        # stale, so comes from the cache but is refreshed for next time
+        ("2026-01-01 12:01:00", ["old", "new"], 2),
+        ("2026-01-01 12:10:59", ["old", "new"], 2),
+        # too stale to use, so has to wait for a fresh copy
+        ("2026-01-01 12:11:00", ["new", "new"], 2),
+    ],
+)
+def test_client_serves_stale_service_while_refreshing(
+    app_, rmock, service_id, stale_while_revalidate_client, time_of_second_call, expected_services, expected_requests
+):
+    rmock.get(
+        "{}/service/{}".format(app_.config["API_HOST_NAME"], service_id),
+        [
+            {"json": {"data": {"name": "old", "contact_link": "https://example.gov.uk"}}},
+            {"json": {"data": {"name": "new", "contact_link": "https://example.gov.uk"}}},
+        ],
+    )
+
+    with freeze_time("2026-01-01 12:00:00"):
+        stale_while_revalidate_client.get_service(service_id)
+
+    with freeze_time(time_of_second_call):
+        services = [stale_while_revalidate_client.get_service(service_id)["data"]["name"] for _ in range(2)]
+
+    assert services == expected_services
+    assert len(rmock.request_history) == expected_requests
+
+
+def test_client_serves_stale_service_if_refreshing_fails(
+    app_, rmock, service_id, stale_while_revalidate_client, mocker
+):
+    mock_warning = mocker.patch.object(app_.logger, "warning")
+    rmock.get(
+        "{}/service/{}".format(app_.config["API_HOST_NAME"], service_id),
+        [
+            {"json": {"data": {"name": "old", "contact_link": "https://example.gov.uk"}}},
+            {"status_code": 503},
+            {"status_code": 503},
+        ],
+    )
+
+    with freeze_time("2026-01-01 12:00:00"):
+        stale_while_revalidate_client.get_service(service_id)
+
+    with freeze_time("2026-01-01 12:05:00"):
+        assert stale_while_revalidate_client.get_service(service_id)["data"]["name"] == "old"
+        assert stale_while_revalidate_client.get_service(service_id)["data"]["name"] == "old"
+
+    assert len(rmock.request_history) == 3
+    assert mock_warning.call_count == 2
+
+
+def test_client_reuses_signed_token(app_, rmock, service_id, sample_service, mocker):
+    mock_create_jwt_token = mocker.patch(
+        "app.notify_client.service_api_client.create_jwt_token", side_effect=["first-token", "second-token"]
+    )
+    client = ServiceApiClient(app_)
+    rmock.get(
+        "{}/service/{}".format(app_.config["API_HOST_NAME"], service_id),
+        json={"data": sample_service},
+    )
+
+    mocker.patch.object(admin_api_tokens, "_timer", side_effect=[0, 9, 10, 10])
+
+    client.get_service(service_id)
+    client.get_service(service_id)
+    client.get_service(service_id)
+
+    assert [request.headers["Authorization"] for request in rmock.request_history] == [
+        "Bearer first-token",
+        "Bearer first-token",
+        "Bearer second-token",
+    ]
+    mock_create_jwt_token.assert_called_with(app_.config["ADMIN_CLIENT_SECRET"], app_.config["ADMIN_CLIENT_USER_NAME"])
+
+
+@pytest.mark.parametrize(
+    "data, params",
+    [
+        (None, None),
+        ({"ids": {"a"}}, None),
+        (None, {"page": 2}),
+    ],
+)
+def test_onwards_request_client_creates_the_same_request_objects_as_the_library(app_, mocker, data, params):
+    mocker.patch("notifications_python_client.base.create_jwt_token", return_value="token")
+    mocker.patch.object(admin_api_tokens, "get", return_value="token")
+    api_client = ServiceApiClient(app_).api_client
+
+    assert api_client._create_request_objects("/service/1234", data, params) == BaseAPIClient._create_request_objects(
+        api_client, "/service/1234", data, params
+    )
+
+
+def test_reusable_tokens_are_signed_for_each_client(mocker):
+    mocker.patch(
+        "app.notify_client.service_api_client.create_jwt_token", side_effect=lambda secret, client_id: client_id
+    )
+    tokens = ReusableTokens(max_age=10)
+
+    assert tokens.get("secret", "one-client") == "one-client"
+    assert tokens.get("secret", "another-client") == "another-client"
+
+
+def test_reusable_tokens_are_re_signed_if_clock_goes_backwards(mocker):
+    mocker.patch("app.notify_client.service_api_client.create_jwt_token", side_effect=["first-token", "second-token"])
+    tokens = ReusableTokens(max_age=10, timer=mock.Mock(side_effect=[100, 99, 99]))
+
+    assert tokens.get("secret", "client") == "first-token"
+    assert tokens.get("secret", "client") == "second-token"
+
+
+def test_service_api_client_is_shared_between_contexts(app_, mocker):
+    mock_clients_created = mocker.patch("app.notify_client.service_api_client.SERVICE_API_CLIENTS_CREATED")
+    clients = []
+
+    for _ in range(3):
+        with app_.test_request_context():
+            clients.append(get_service_api_client())
+    clients.append(BackgroundCall(get_service_api_client).wait())
+
+    assert all(client is clients[0] for client in clients)
+    assert clients[0].api_client.request_session is get_notify_api()
+    assert mock_clients_created.inc.call_count == 1
+
+    reset_memos()
+
+    assert get_service_api_client() is not clients[0]
+    assert mock_clients_created.inc.call_count == 2
+
+
+def test_shared_client_sends_onwards_request_headers_of_current_request(app_, rmock, sample_service):
+    rmock.get(requests_mock.ANY, json={"data": sample_service})
+
+    for trace_id in ("first-request", "second-request"):
+        with app_.test_request_context():
+            request.get_onwards_request_headers = lambda trace_id=trace_id: {"X-B3-TraceId": trace_id}
+            get_service_api_client().get_service(uuid4())
+
+    assert [sent_request.headers["X-B3-TraceId"] for sent_request in rmock.request_history] == [
+        "first-request",
+        "second-request",
+    ]
@@ -0,0 +1,23 @@
+import pytest
+
+from app.cache_control import NO_STORE, cache_control_for
+
+
+@pytest.mark.parametrize(
+    "endpoint, status_code, has_query_string, sets_cookie, expected_cache_control",
+    [
+        ("main.services", 301, False, False, "public, max-age=86400"),
+        ("main.services", 301, True, False, "private, max-age=86400"),
+        ("main.services", 301, False, True, NO_STORE),
+        ("main.services", 404, False, False, NO_STORE),
+        ("main.security_policy", 302, False, False, "public, max-age=3600"),
+        ("main.security_policy", 500, False, False, NO_STORE),
+        ("main.landing", 200, True, False, NO_STORE),
+        (None, 404, False, False, NO_STORE),
+    ],
+)
+def test_cache_control_for(endpoint, status_code, has_query_string, sets_cookie, expected_cache_control):
+    assert (
+        cache_control_for(endpoint, status_code, has_query_string=has_query_string, sets_cookie=sets_cookie)
+        == expected_cache_control
+    )
@@ -0,0 +1,208 @@
+import sqlite3
+
+import pytest
+
+from app import get_service_cache
+from app.caching import LocalCache, RedisCache, SharedMemoryCache
+
+
+def test_local_cache_returns_values_that_have_been_set():
+    cache = LocalCache("test", maxsize=10, ttl=60)
+
+    assert cache.get("foo") is None
+
+    cache.set("foo", {"data": "bar"})
+
+    assert cache.get("foo") == {"data": "bar"}
+
+
+def test_local_cache_expires_values_after_ttl(timer):
+    cache = LocalCache("test", maxsize=10, ttl=60, timer=timer)
+    cache.set("foo", "bar")
+
+    timer.now = 59
+    assert cache.get("foo") == "bar"
+
+    timer.now = 60
+    assert cache.get("foo") is None
+
+
+def test_local_cache_evicts_least_recently_used_value_when_full():
+    cache = LocalCache("test", maxsize=2, ttl=60)
+    cache.set("foo", 1)
+    cache.set("bar", 2)
+    cache.get("foo")
+
+    cache.set("baz", 3)
+
+    assert len(cache) == 2
+    assert cache.get("foo") == 1
+    assert cache.get("bar") is None
+    assert cache.get("baz") == 3
+
+
+def test_local_cache_counts_hits_and_misses(mocker):
+    mock_lookups = mocker.patch("app.caching.CACHE_LOOKUPS")
+    cache = LocalCache("test", maxsize=10, ttl=60)
+    cache.set("foo", "bar")
+
+    cache.get("foo")
+    cache.get("foo")
+    cache.get("baz")
+
+    mock_lookups.labels.assert_any_call("test", "hit")
+    mock_lookups.labels.assert_any_call("test", "miss")
+    assert mock_lookups.labels.return_value.inc.call_count == 3
+
+
+def test_local_cache_clear():
+    cache = LocalCache("test", maxsize=10, ttl=60)
+    cache.set("foo", "bar")
+
+    cache.clear()
+
+    assert cache.get("foo") is None
+
+
+@pytest.fixture
+def shared_memory_cache_path(tmp_path):
+    return str(tmp_path / "cache.sqlite3")
+
+
+def test_shared_memory_cache_is_shared_between_processes(shared_memory_cache_path):
+    # each worker process has its own connection to the same database
+    worker_1_cache = SharedMemoryCache("test", path=shared_memory_cache_path, maxsize=10, ttl=60)
+    worker_2_cache = SharedMemoryCache("test", path=shared_memory_cache_path, maxsize=10, ttl=60)
+
+    assert worker_2_cache.get("foo") is None
+
+    worker_1_cache.set("foo", {"data": {"name": "bar"}})
+
+    assert worker_2_cache.get("foo") == {"data": {"name": "bar"}}
+
+
+def test_shared_memory_cache_keeps_caches_separate(shared_memory_cache_path):
+    service_cache = SharedMemoryCache("service", path=shared_memory_cache_path, maxsize=10, ttl=60)
+    other_cache = SharedMemoryCache("other", path=shared_memory_cache_path, maxsize=10, ttl=60)
+
+    service_cache.set("foo", "bar")
+
+    assert other_cache.get("foo") is None
+
+
+def test_shared_memory_cache_expires_values_after_ttl(shared_memory_cache_path, timer):
+    cache = SharedMemoryCache("test", path=shared_memory_cache_path, maxsize=10, ttl=60, timer=timer)
+    cache.set("foo", "bar")
+
+    timer.now = 59
+    assert cache.get("foo") == "bar"
+
+    timer.now = 60
+    assert cache.get("foo") is None
+
+
+def test_shared_memory_cache_evicts_values_closest_to_expiry_when_full(shared_memory_cache_path, timer):
+    cache = SharedMemoryCache("test", path=shared_memory_cache_path, maxsize=2, ttl=60, timer=timer)
+    cache.set("foo", 1)
+    timer.now = 1
+    cache.set("bar", 2)
+    timer.now = 2
+    cache.set("baz", 3)
+
+    assert cache.get("foo") is None
+    assert cache.get("bar") == 2
+    assert cache.get("baz") == 3
+
+
+def test_shared_memory_cache_clear(shared_memory_cache_path):
+    cache = SharedMemoryCache("test", path=shared_memory_cache_path, maxsize=10, ttl=60)
+    cache.set("foo", "bar")
+
+    cache.clear()
+
+    assert cache.get("foo") is None
+
+
+def test_shared_memory_cache_gives_up_storing_values_while_locked(shared_memory_cache_path, caplog):
+    cache = SharedMemoryCache("test", path=shared_memory_cache_path, maxsize=10, ttl=60, busy_timeout=0.01)
+    # another worker holding the write lock
+    other_connection = sqlite3.connect(shared_memory_cache_path, isolation_level=None)
+    other_connection.execute("BEGIN EXCLUSIVE")
+
+    cache.set("foo", "bar")
+
+    assert "Failed to store foo in test cache: database is locked" in caplog.text
+
+    other_connection.execute("ROLLBACK")
+    assert cache.get("foo") is None
+
+
+def test_shared_memory_cache_misses_if_database_cannot_be_read(shared_memory_cache_path, mocker, caplog):
+    mock_lookups = mocker.patch("app.caching.CACHE_LOOKUPS")
+    cache = SharedMemoryCache("test", path=shared_memory_cache_path, maxsize=10, ttl=60)
+    cache._connection = mocker.Mock(execute=mocker.Mock(side_effect=sqlite3.OperationalError("disk I/O error")))
+
+    assert cache.get("foo") is None
+
+    assert "Failed to read foo from test cache: disk I/O error" in caplog.text
+    mock_lookups.labels.assert_any_call("test", "miss")
+
+
+def test_shared_memory_cache_raises_if_database_cannot_be_set_up(shared_memory_cache_path):
+    # another worker holding the write lock while it creates the table
+    other_connection = sqlite3.connect(shared_memory_cache_path, isolation_level=None)
+    other_connection.execute("BEGIN EXCLUSIVE")
+
+    with pytest.raises(sqlite3.OperationalError, match="database is locked"):
+        SharedMemoryCache("test", path=shared_memory_cache_path, maxsize=10, ttl=60, busy_timeout=0.01)
+
+    other_connection.execute("ROLLBACK")
+
+
+def test_redis_cache_get(mocker):
+    mock_redis_client = mocker.Mock(get=mocker.Mock(return_value=b'{"data": {"name": "bar"}}'))
+    cache = RedisCache("test", redis_client=mock_redis_client, ttl=60)
+
+    assert cache.get("foo") == {"data": {"name": "bar"}}
+    mock_redis_client.get.assert_called_once_with("document-download-frontend-test-foo")
+
+
+def test_redis_cache_get_miss(mocker):
+    mock_redis_client = mocker.Mock(get=mocker.Mock(return_value=None))
+    cache = RedisCache("test", redis_client=mock_redis_client, ttl=60)
+
+    assert cache.get("foo") is None
+
+
+def test_redis_cache_set(mocker):
+    mock_redis_client = mocker.Mock()
+    cache = RedisCache("test", redis_client=mock_redis_client, ttl=60)
+
+    cache.set("foo", {"data": {"name": "bar"}})
+
+    mock_redis_client.set.assert_called_once_with(
+        "document-download-frontend-test-foo", '{"data": {"name": "bar"}}', ex=60
+    )
+
+
+@pytest.mark.parametrize(
+    "backend, expected_cache_class",
+    [
+        ("local", LocalCache),
+        ("shared-memory", SharedMemoryCache),
+        ("redis", RedisCache),
+    ],
+)
+def test_service_cache_backend_is_configurable(app_, shared_memory_cache_path, backend, expected_cache_class):
+    app_.config["SERVICE_CACHE_BACKEND"] = backend
+    app_.config["SHARED_MEMORY_CACHE_PATH"] = shared_memory_cache_path
+
+    assert isinstance(get_service_cache(), expected_cache_class)
+
+
+def test_service_cache_falls_back_to_local_cache_if_shared_memory_cache_cannot_be_opened(app_, tmp_path, caplog):
+    app_.config["SERVICE_CACHE_BACKEND"] = "shared-memory"
+    app_.config["SHARED_MEMORY_CACHE_PATH"] = str(tmp_path / "missing-directory" / "cache.sqlite3")
+
+    assert isinstance(get_service_cache(), LocalCache)
+    assert "Failed to open shared memory cache" in caplog.text
@@ -1,7 +1,14 @@
+from unittest.mock import Mock
+
+import pytest
 from bs4 import BeautifulSoup
-from flask import url_for
+from flask import render_template, request, url_for
 from flask_wtf.csrf import CSRFError
+from notifications_python_client.errors import HTTPError
 
+from app import get_error_page
+from app.upstream.bulkhead import BulkheadFull
+from app.upstream.circuit_breaker import CircuitBreakerOpen
 from tests import normalize_spaces
 
 
@@ -39,3 +46,87 @@ def test_csrf_error_returns_400_status_code_and_500_error_page(
 
     page = BeautifulSoup(response.data.decode("utf-8"), "html.parser")
     assert normalize_spaces(page.h1.text) == "Sorry, there’s a problem with the service"
+
+
+def test_upstream_unavailable_returns_503_status_code_and_500_error_page(
+    service_id,
+    document_id,
+    key,
+    client,
+    mocker,
+):
+    mocker.patch("app.service_api_client.get_service", side_effect=HTTPError(response=Mock(status_code=503)))
+
+    response = client.get(url_for("main.landing", service_id=service_id, document_id=document_id, key=key))
+    assert response.status_code == 503
+
+    page = BeautifulSoup(response.data.decode("utf-8"), "html.parser")
+    assert normalize_spaces(page.h1.text) == "Sorry, there’s a problem with the service"
+
+
+@pytest.mark.parametrize("error", [CircuitBreakerOpen, BulkheadFull])
+def test_document_download_api_refused_returns_500_status_code_and_500_error_page(
+    app_, service_id, document_id, key, client, mocker, sample_service, error
+):
+    app_.config["DEBUG"] = False
+    mocker.patch("app.service_api_client.get_service", return_value={"data": sample_service})
+    mocker.patch("app.main.views.index._fetch_document_metadata", side_effect=error("refused"))
+
+    response = client.get(url_for("main.landing", service_id=service_id, document_id=document_id, key=key))
+    assert response.status_code == 500
+
+    page = BeautifulSoup(response.data.decode("utf-8"), "html.parser")
+    assert normalize_spaces(page.h1.text) == "Sorry, there’s a problem with the service"
+
+
+def test_upstream_calls_after_deadline_return_504_status_code_and_500_error_page(
+    app_,
+    service_id,
+    document_id,
+    key,
+    client,
+    rmock,
+):
+    app_.config["HTTP_SERVE_TIMEOUT_SECONDS"] = 1
+    app_.config["UPSTREAM_DEADLINE_MARGIN_SECONDS"] = 1
+
+    response = client.get(url_for("main.landing", service_id=service_id, document_id=document_id, key=key))
+    assert response.status_code == 504
+
+    page = BeautifulSoup(response.data.decode("utf-8"), "html.parser")
+    assert normalize_spaces(page.h1.text) == "Sorry, there’s a problem with the service"
+    assert rmock.called is False
+
+
+def test_upstream_deadline_counts_time_before_the_request_reached_flask(
+    app_,
+    service_id,
+    document_id,
+    key,
+    client,
+    mocker,
+    rmock,
+):
+    app_.config["HTTP_SERVE_TIMEOUT_SECONDS"] = 10
+    app_.config["UPSTREAM_DEADLINE_MARGIN_SECONDS"] = 1
+    mocker.patch("app.time_since_request_start", return_value=9)
+
+    response = client.get(url_for("main.landing", service_id=service_id, document_id=document_id, key=key))
+    assert response.status_code == 504
+    assert rmock.called is False
+
+
+@pytest.mark.parametrize("url, template_name", [("/bad_url", "error/404.html"), ("/security.txt", "error/500.html")])
+def test_error_pages_are_rendered_once_with_each_requests_nonce(app_, client, mocker, url, template_name):
+    mocker.patch("app.main.views.index.redirect", side_effect=Exception("oh no"))
+    app_.config["DEBUG"] = False
+    mocker.patch("secrets.token_urlsafe", side_effect=["first-nonce", "second-nonce"])
+
+    first_response = client.get(url)
+    second_response = client.get(url)
+
+    assert get_error_page.cache_info().misses == 1
+    for response, nonce in [(first_response, "first-nonce"), (second_response, "second-nonce")]:
+        with app_.test_request_context():
+            request.csp_nonce = nonce
+            assert response.get_data(as_text=True) == render_template(template_name)
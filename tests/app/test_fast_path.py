@@ -0,0 +1,123 @@
+from unittest.mock import call
+
+import pytest
+from werkzeug.exceptions import MethodNotAllowed
+from werkzeug.test import Client
+
+from app.fast_path import SERVICES_REDIRECT_RULES, STATUS_RULE
+from app.security_headers import HEADERS, SecurityHeadersMiddleware
+
+DOCUMENT_PATH = "/services/11111111-1111-4111-1111-111111111111/documents/22222222-2222-4222-2222-222222222222"
+
+
+@pytest.fixture
+def flask_client(app_, mocker):
+    # the fast path sends the content security policy without a nonce, as none of its responses have any content
+    # that would need one
+    mocker.patch("secrets.token_urlsafe", return_value="")
+    # JSON is only pretty-printed in debug mode
+    app_.json.compact = True
+
+    # goes straight to Flask, without the fast path in front of it
+    fast_path = app_.wsgi_app.wsgi_app
+    return Client(SecurityHeadersMiddleware(fast_path.wsgi_app))
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/_status",
+        "/services/_status",
+        DOCUMENT_PATH,
+        f"{DOCUMENT_PATH}.pdf",
+        f"{DOCUMENT_PATH}/check",
+        f"{DOCUMENT_PATH}/check?key=123456",
+        f"{DOCUMENT_PATH}/check?key=a%20b&x=<y>",
+    ],
+)
+@pytest.mark.parametrize("method", ["GET", "HEAD"])
+def test_fast_path_responses_match_flask(client, flask_client, url, method):
+    fast_response = client.open(url, method=method)
+    flask_response = flask_client.open(url, method=method)
+
+    assert fast_response.status == flask_response.status
+    assert fast_response.get_data() == flask_response.get_data()
+    assert sorted(fast_response.headers.items()) == sorted(flask_response.headers.items())
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/services/not-a-uuid/documents/22222222-2222-4222-2222-222222222222",
+        f"{DOCUMENT_PATH}/authenticate",
+        "/_status/",
+    ],
+)
+def test_fast_path_leaves_other_paths_to_flask(client, mocker, url):
+    requests_total = mocker.patch("app.fast_path.HTTP_SERVER_REQUESTS_TOTAL")
+
+    response = client.get(url)
+
+    assert response.status_code == 404
+    assert requests_total.labels.call_args_list == []
+
+
+def test_fast_path_leaves_other_methods_to_flask(client, mocker):
+    requests_total = mocker.patch("app.fast_path.HTTP_SERVER_REQUESTS_TOTAL")
+
+    with pytest.raises(MethodNotAllowed):
+        client.post(DOCUMENT_PATH)
+
+    assert requests_total.labels.call_args_list == []
+
+
+@pytest.mark.parametrize(
+    "url, expected_rule, expected_status_code",
+    [
+        ("/_status", "/_status", 200),
+        (f"{DOCUMENT_PATH}.pdf", "/services/<uuid:service_id>/documents/<uuid:document_id>.<extension>", 301),
+    ],
+)
+def test_fast_path_counts_requests_like_flask(app_, client, mocker, url, expected_rule, expected_status_code):
+    requests_total = mocker.patch("app.fast_path.HTTP_SERVER_REQUESTS_TOTAL")
+    request_duration = mocker.patch("app.fast_path.HTTP_SERVER_REQUEST_DURATION_SECONDS")
+
+    client.get(url)
+
+    expected_labels = call("GET", app_.config["SERVER_NAME"], expected_rule, expected_status_code)
+    assert requests_total.labels.call_args_list == [expected_labels]
+    assert requests_total.labels.return_value.inc.call_args_list == [call()]
+    assert request_duration.labels.call_args_list == [expected_labels]
+    assert request_duration.labels.return_value.observe.call_count == 1
+
+
+def test_fast_path_rules_match_flask_routes(app_):
+    flask_rules = {rule.rule for rule in app_.url_map.iter_rules()}
+
+    assert STATUS_RULE in flask_rules
+    for _pattern, rule in SERVICES_REDIRECT_RULES:
+        assert rule in flask_rules
+
+
+def test_fast_path_responses_only_have_content_caching_and_security_headers(app_, client):
+    # the Flask view's response would also have a Server-Timing header
+    app_.config["SERVER_TIMING_ENABLED"] = True
+
+    response = client.get("/_status")
+
+    assert set(response.headers.keys()) == {
+        "Cache-Control",
+        "Content-Type",
+        "Content-Length",
+        "Content-Security-Policy",
+        *(name for name, _value in HEADERS),
+    }
+
+
+def test_fast_path_times_requests_from_when_it_is_called(client, mocker):
+    mocker.patch("app.fast_path.monotonic", side_effect=[10, 10.5])
+    request_duration = mocker.patch("app.fast_path.HTTP_SERVER_REQUEST_DURATION_SECONDS")
+
+    client.get("/_status")
+
+    assert request_duration.labels.return_value.observe.call_args_list == [call(0.5)]
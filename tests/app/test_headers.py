@@ -1,3 +1,4 @@
+import pytest
 from flask import url_for
 
 
@@ -51,3 +52,23 @@ def test_owasp_useful_headers_set(
         == "geolocation=(), microphone=(), camera=(), autoplay=(), payment=(), sync-xhr=()"
     )
     assert response.headers["Server"] == "Cloudfront"
+
+
+@pytest.mark.parametrize(
+    "url, expected_cache_control",
+    [
+        ("/security.txt", "public, max-age=3600"),
+        ("/.well-known/security.txt", "public, max-age=3600"),
+        ("/services/_status", "public, max-age=86400"),
+        (
+            "/services/11111111-1111-4111-1111-111111111111/documents/22222222-2222-4222-2222-222222222222/check?key=123",
+            "private, max-age=86400",
+        ),
+        ("/_status", "no-store, no-cache, private, must-revalidate"),
+        ("/no-such-page", "no-store, no-cache, private, must-revalidate"),
+    ],
+)
+def test_cache_control_depends_on_endpoint(client, url, expected_cache_control):
+    response = client.get(url)
+
+    assert response.headers.getlist("Cache-Control") == [expected_cache_control]
@@ -0,0 +1,71 @@
+import pytest
+from flask import Flask, render_template, request
+
+from app import compile_templates, create_app
+from app.forms import EmailAddressForm
+
+TEMPLATE_CONTEXT = {
+    "service_name": "Sample Service",
+    "service_contact_info": "https://sample-service.gov.uk",
+    "contact_info_type": "link",
+    "file_size": 42,
+    "file_type": "PDF",
+    "download_link": "https://download.example.gov.uk/file.pdf",
+}
+
+
+@pytest.fixture(scope="module")
+def precompiled_templates_path(tmp_path_factory):
+    app = Flask("app")
+    create_app(app)
+
+    path = tmp_path_factory.mktemp("precompiled_templates")
+    compile_templates(app, path)
+    return str(path)
+
+
+@pytest.fixture
+def precompiled_app(mocker, precompiled_templates_path):
+    mocker.patch("app.config.Test.PRECOMPILED_TEMPLATES_PATH", precompiled_templates_path)
+
+    app = Flask("app")
+    create_app(app)
+    return app
+
+
+def _render(app, template_name, fake_nonce):
+    with app.test_request_context():
+        request.csp_nonce = fake_nonce
+        return render_template(template_name, form=EmailAddressForm(), **TEMPLATE_CONTEXT)
+
+
+@pytest.mark.parametrize(
+    "template_name",
+    [
+        "views/landing.html",
+        "views/confirm-email-address.html",
+        "views/download.html",
+        "views/file-unavailable.html",
+        "views/link-scanner.html",
+        "error/404.html",
+        "error/500.html",
+    ],
+)
+def test_precompiled_templates_render_the_same_as_source(app_, precompiled_app, template_name, fake_nonce):
+    with precompiled_app.app_context():
+        template = precompiled_app.jinja_env.get_template(template_name)
+        assert template.filename.startswith(precompiled_app.config["PRECOMPILED_TEMPLATES_PATH"])
+
+    assert _render(precompiled_app, template_name, fake_nonce) == _render(app_, template_name, fake_nonce)
+
+
+def test_templates_missing_from_precompiled_templates_are_loaded_from_source(app_, mocker, tmp_path, fake_nonce):
+    mocker.patch("app.config.Test.PRECOMPILED_TEMPLATES_PATH", str(tmp_path))
+
+    app = Flask("app")
+    create_app(app)
+
+    with app.app_context():
+        assert app.jinja_env.get_template("views/landing.html").filename.endswith("app/templates/views/landing.html")
+
+    assert _render(app, "views/landing.html", fake_nonce) == _render(app_, "views/landing.html", fake_nonce)
@@ -0,0 +1,58 @@
+import pytest
+from flask import Request
+from werkzeug.test import EnvironBuilder
+
+from app.link_scanners import LinkScannerDetector
+
+
+def _request(headers=None, remote_addr="192.0.2.1"):
+    return Request(EnvironBuilder(headers=headers, environ_base={"REMOTE_ADDR": remote_addr}).get_environ())
+
+
+@pytest.mark.parametrize(
+    "request_, expected_reason",
+    [
+        (_request(headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0"}), None),
+        (_request(headers={"User-Agent": "Proofpoint URL Defense"}), "user_agent"),
+        (_request(headers={"User-Agent": "mimecast-url-protect"}), "user_agent"),
+        (_request(remote_addr="198.51.100.20"), "ip_range"),
+        (_request(remote_addr="2001:db8::1"), "ip_range"),
+        (_request(headers={"X-Forwarded-For": "198.51.100.20"}), "ip_range"),
+        (_request(headers={"X-Forwarded-For": "192.0.2.50, 198.51.100.20"}), "ip_range"),
+        # only the address our proxy added is used, not any the client sent
+        (_request(headers={"X-Forwarded-For": "198.51.100.20, 192.0.2.50"}), None),
+        (_request(headers={"X-Forwarded-For": "not-an-ip-address"}), None),
+        (_request(headers={"Purpose": "Prefetch"}), "prefetch_header"),
+        (_request(headers={"Purpose": "something-else"}), None),
+    ],
+)
+def test_link_scanner_detector(request_, expected_reason):
+    detector = LinkScannerDetector(
+        user_agents=["proofpoint", "Mimecast"],
+        ip_ranges=["198.51.100.0/24", "2001:db8::/32"],
+        prefetch_headers=["Purpose: prefetch"],
+    )
+
+    assert detector.detect(request_) == expected_reason
+
+
+def test_link_scanner_detector_detects_nothing_by_default():
+    assert LinkScannerDetector().detect(_request(headers={"User-Agent": "Proofpoint URL Defense"})) is None
+
+
+@pytest.mark.parametrize(
+    "trusted_proxies, forwarded_for, expected_reason",
+    [
+        (2, "198.51.100.20, 192.0.2.50", "ip_range"),
+        (2, "192.0.2.50, 198.51.100.20", None),
+        # not enough proxies to trust any of it
+        (2, "198.51.100.20", None),
+        (0, "198.51.100.20", None),
+    ],
+)
+def test_link_scanner_detector_trusts_x_forwarded_for_from_configured_proxies(
+    trusted_proxies, forwarded_for, expected_reason
+):
+    detector = LinkScannerDetector(ip_ranges=["198.51.100.0/24"], trusted_proxies=trusted_proxies)
+
+    assert detector.detect(_request(headers={"X-Forwarded-For": forwarded_for})) == expected_reason
@@ -0,0 +1,66 @@
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+from app.security_headers import CSP_NONCE_ENVIRON_KEY, HEADERS, SecurityHeadersMiddleware
+
+
+def _app_sending(headers, environ_updates=None):
+    def app(environ, start_response):
+        environ.update(environ_updates or {})
+        start_response("200 OK", headers)
+        return [b"hello"]
+
+    return app
+
+
+def test_security_headers_are_added_after_the_apps_own():
+    app_headers = [("Content-Type", "text/plain")]
+    client = Client(SecurityHeadersMiddleware(_app_sending(app_headers)))
+
+    response = client.get("/")
+
+    assert list(response.headers.items()) == [
+        ("Content-Type", "text/plain"),
+        *HEADERS,
+        ("Content-Security-Policy", response.headers["Content-Security-Policy"]),
+    ]
+    assert response.get_data() == b"hello"
+    # the app's list isn't changed, so it can be reused
+    assert app_headers == [("Content-Type", "text/plain")]
+
+
+def test_content_security_policy_has_the_requests_nonce():
+    client = Client(SecurityHeadersMiddleware(_app_sending([], {CSP_NONCE_ENVIRON_KEY: "abc123"})))
+
+    response = client.get("/")
+
+    assert response.headers["Content-Security-Policy"] == (
+        "default-src 'self';"
+        "script-src 'self' 'nonce-abc123';"
+        "connect-src 'self';"
+        "object-src 'self';"
+        "font-src 'self' data:;"
+        "img-src 'self' data:;"
+        "style-src 'self' 'nonce-abc123';"
+        "frame-ancestors 'self';"
+        "frame-src 'self';"
+    )
+
+
+def test_content_security_policy_without_a_nonce():
+    client = Client(SecurityHeadersMiddleware(Response("hello")))
+
+    response = client.get("/")
+
+    assert "'nonce-';" in response.headers["Content-Security-Policy"]
+
+
+def test_error_pages_have_security_headers_with_the_pages_nonce(client, mocker, fake_nonce):
+    mocker.patch("secrets.token_urlsafe", return_value=fake_nonce)
+
+    response = client.get("/no-such-page")
+
+    assert response.status_code == 404
+    assert response.headers["X-Frame-Options"] == "DENY"
+    assert f"'nonce-{fake_nonce}'" in response.headers["Content-Security-Policy"]
+    assert f'nonce="{fake_nonce}"' in response.get_data(as_text=True)
@@ -0,0 +1,67 @@
+import re
+from unittest import mock
+
+import pytest
+from flask import url_for
+from freezegun import freeze_time
+
+from app.server_timing import DEBUG_TOKEN_HEADER, sign_debug_token, time_since_request_start
+
+
+@pytest.fixture
+def landing_page_url(service_id, document_id, key, document_has_metadata_no_confirmation, mocker, sample_service):
+    mocker.patch("app.service_api_client.get_service", return_value={"data": sample_service})
+    return url_for("main.landing", service_id=service_id, document_id=document_id, key=key)
+
+
+def test_server_timing_is_off_by_default(client, landing_page_url):
+    response = client.get(landing_page_url, headers={DEBUG_TOKEN_HEADER: "not-a-valid-token"})
+
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+
+
+def test_server_timing_header_breaks_down_request(app_, client, landing_page_url, mocker):
+    app_.config["SERVER_TIMING_ENABLED"] = True
+    mock_log = mocker.patch.object(app_.logger, "info")
+
+    response = client.get(landing_page_url)
+
+    assert response.status_code == 200
+    stages = [
+        re.fullmatch(r'(\w+);dur=\d+(\.\d+)?;desc="[^"]+"', timing).group(1)
+        for timing in response.headers["Server-Timing"].split(", ")
+    ]
+    assert stages == ["routing", "service", "metadata", "render", "headers", "total"]
+
+    extra = {"endpoint": "main.landing", "server_timing_ms": dict.fromkeys(stages, mock.ANY)}
+    mock_log.assert_any_call("Server timings for %(endpoint)s: %(server_timing_ms)s", extra, extra=extra)
+
+
+def test_server_timing_can_be_turned_on_with_debug_token(app_, client, landing_page_url):
+    with app_.test_request_context():
+        token = sign_debug_token()
+
+    response = client.get(landing_page_url, headers={DEBUG_TOKEN_HEADER: token})
+
+    assert response.headers["Server-Timing"].startswith("routing;dur=")
+
+
+def test_server_timing_debug_token_expires(app_, client, landing_page_url):
+    with freeze_time("2026-01-01 12:00:00"), app_.test_request_context():
+        token = sign_debug_token()
+
+    with freeze_time("2026-01-01 13:00:01"):
+        response = client.get(landing_page_url, headers={DEBUG_TOKEN_HEADER: token})
+
+    assert "Server-Timing" not in response.headers
+
+
+def test_time_since_request_start(app_, mocker):
+    mocker.patch("app.server_timing.time.perf_counter", return_value=12.5)
+
+    with app_.test_request_context(environ_base={"document_download_frontend.request_start": 10.0}):
+        assert time_since_request_start() == 2.5
+
+    with app_.test_request_context():
+        assert time_since_request_start() == 0
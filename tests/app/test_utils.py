@@ -1,6 +1,8 @@
+import eventlet
 import pytest
+from flask import current_app
 
-from app.utils import assess_contact_type
+from app.utils import BackgroundCall, assess_contact_type
 
 
 @pytest.mark.parametrize(
@@ -18,3 +20,36 @@ from app.utils import assess_contact_type
 )
 def test_assess_contact_type_recognises_email_phone_and_link(contact_info, expected_result):
     assert assess_contact_type(contact_info) == expected_result
+
+
+def test_background_call_returns_result(app_):
+    call = BackgroundCall(lambda a, b: (a, b, current_app.name), 1, b=2)
+
+    assert call.wait() == (1, 2, app_.name)
+
+
+def test_background_call_raises_error():
+    def _raise():
+        raise ValueError("oh no")
+
+    call = BackgroundCall(_raise)
+
+    with pytest.raises(ValueError, match="oh no"):
+        call.wait()
+
+
+def test_background_call_runs_while_caller_waits_on_something_else():
+    events = []
+
+    def _background():
+        events.append("background started")
+        eventlet.sleep(0.01)
+        events.append("background finished")
+
+    call = BackgroundCall(_background)
+    events.append("foreground started")
+    eventlet.sleep(0.01)
+    events.append("foreground finished")
+    call.wait()
+
+    assert events.index("background started") < events.index("foreground finished")
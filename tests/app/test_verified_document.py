@@ -0,0 +1,86 @@
+from datetime import date, timedelta
+
+import pytest
+from freezegun import freeze_time
+
+from app.verified_document import load_verified_document, sign_verified_document
+
+
+@pytest.fixture
+def metadata():
+    return {
+        "direct_file_url": "https://download.test-doc-download-api.gov.uk/some-file",
+        "confirm_email": False,
+        "size_in_bytes": 712099,
+        "file_extension": "pdf",
+        "available_until": str(date.today() + timedelta(days=5)),
+        "some_other_field": "not needed",
+    }
+
+
+def test_verified_document_round_trip(app_, service_id, document_id, key, sample_service, metadata):
+    token = sign_verified_document(service_id, document_id, key, {"data": sample_service}, metadata)
+
+    service, loaded_metadata = load_verified_document(token, service_id, document_id, key)
+
+    assert service == {"data": sample_service}
+    assert loaded_metadata == {
+        "direct_file_url": "https://download.test-doc-download-api.gov.uk/some-file",
+        "confirm_email": False,
+        "size_in_bytes": 712099,
+        "file_extension": "pdf",
+        "available_until": str(date.today() + timedelta(days=5)),
+    }
+
+
+@pytest.mark.parametrize("token", [None, "", "not-a-real-token"])
+def test_load_verified_document_rejects_missing_or_invalid_token(app_, service_id, document_id, key, token):
+    assert load_verified_document(token, service_id, document_id, key) is None
+
+
+def test_load_verified_document_rejects_token_signed_with_another_secret(
+    app_, service_id, document_id, key, sample_service, metadata
+):
+    token = sign_verified_document(service_id, document_id, key, {"data": sample_service}, metadata)
+    app_.config["SECRET_KEY"] = "some-other-secret"
+
+    assert load_verified_document(token, service_id, document_id, key) is None
+
+
+@pytest.mark.parametrize(
+    "other_link",
+    [
+        {"document_id": "00000000-0000-0000-0000-000000000000"},
+        {"service_id": "00000000-0000-0000-0000-000000000000"},
+        {"key": "some-other-key"},
+    ],
+)
+def test_load_verified_document_rejects_token_for_another_link(
+    app_, service_id, document_id, key, sample_service, metadata, other_link
+):
+    token = sign_verified_document(service_id, document_id, key, {"data": sample_service}, metadata)
+
+    link = {"service_id": service_id, "document_id": document_id, "key": key, **other_link}
+    assert load_verified_document(token, **link) is None
+
+
+def test_load_verified_document_rejects_old_token(app_, service_id, document_id, key, sample_service, metadata):
+    with freeze_time("2026-01-01 12:00:00"):
+        token = sign_verified_document(service_id, document_id, key, {"data": sample_service}, metadata)
+
+    with freeze_time("2026-01-01 12:04:59"):
+        assert load_verified_document(token, service_id, document_id, key) is not None
+
+    with freeze_time("2026-01-01 12:05:01"):
+        assert load_verified_document(token, service_id, document_id, key) is None
+
+
+def test_load_verified_document_rejects_token_once_document_has_expired(
+    app_, service_id, document_id, key, sample_service, metadata
+):
+    metadata["available_until"] = "2026-01-01"
+    with freeze_time("2026-01-01 23:58:00"):
+        token = sign_verified_document(service_id, document_id, key, {"data": sample_service}, metadata)
+
+    with freeze_time("2026-01-02 00:01:00"):
+        assert load_verified_document(token, service_id, document_id, key) is None
@@ -0,0 +1,31 @@
+from app.upstream.budget import RequestBudget
+
+
+def test_request_budget_starts_full():
+    budget = RequestBudget(ratio=0.1, max_balance=2)
+
+    assert budget.try_withdraw() is True
+    assert budget.try_withdraw() is True
+    assert budget.try_withdraw() is False
+
+
+def test_request_budget_allows_extra_requests_in_proportion_to_ordinary_ones():
+    budget = RequestBudget(ratio=0.25, max_balance=2)
+    budget._balance = 0
+
+    for _ in range(3):
+        budget.deposit()
+    assert budget.try_withdraw() is False
+
+    budget.deposit()
+    assert budget.try_withdraw() is True
+    assert budget.try_withdraw() is False
+
+
+def test_request_budget_balance_is_capped():
+    budget = RequestBudget(ratio=0.5, max_balance=2)
+
+    for _ in range(100):
+        budget.deposit()
+
+    assert [budget.try_withdraw() for _ in range(3)] == [True, True, False]
@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+from app.upstream.bulkhead import Bulkhead, BulkheadFull
+
+
+def _wait_for_queued(bulkhead, count):
+    for _ in range(500):
+        if bulkhead._queued == count:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"never had {count} queued")
+
+
+def test_bulkhead_allows_requests_up_to_max_concurrent(mocker):
+    mock_rejections = mocker.patch("app.upstream.bulkhead.BULKHEAD_REJECTIONS")
+    bulkhead = Bulkhead("test-api", max_concurrent=2, max_queued=0, max_wait=1)
+
+    with bulkhead.slot(), bulkhead.slot():
+        with pytest.raises(BulkheadFull):
+            with bulkhead.slot():
+                pass
+
+    mock_rejections.labels.assert_called_once_with("test-api", "queue_full")
+
+    # slots are given back at the end of each block
+    with bulkhead.slot(), bulkhead.slot():
+        pass
+
+
+def test_bulkhead_queued_request_gets_slot_once_one_is_free(mocker):
+    mock_queued = mocker.patch("app.upstream.bulkhead.BULKHEAD_QUEUED")
+    bulkhead = Bulkhead("test-api", max_concurrent=1, max_queued=1, max_wait=5)
+    results = []
+
+    def _queued_request():
+        with bulkhead.slot():
+            results.append("sent")
+
+    with bulkhead.slot():
+        thread = threading.Thread(target=_queued_request)
+        thread.start()
+        _wait_for_queued(bulkhead, 1)
+
+        # the queue is full, so any more are refused without waiting
+        with pytest.raises(BulkheadFull):
+            with bulkhead.slot():
+                pass
+
+        assert results == []
+
+    thread.join()
+
+    assert results == ["sent"]
+    assert bulkhead._queued == 0
+    assert [call.args for call in mock_queued.labels.return_value.set.call_args_list] == [(0,), (1,), (0,)]
+
+
+def test_bulkhead_refuses_queued_request_after_max_wait(mocker):
+    mock_rejections = mocker.patch("app.upstream.bulkhead.BULKHEAD_REJECTIONS")
+    bulkhead = Bulkhead("test-api", max_concurrent=1, max_queued=1, max_wait=0.01)
+
+    with bulkhead.slot():
+        with pytest.raises(BulkheadFull):
+            with bulkhead.slot():
+                pass
+
+    mock_rejections.labels.assert_called_once_with("test-api", "wait_timeout")
+    assert bulkhead._queued == 0
@@ -0,0 +1,109 @@
+import pytest
+
+from app.upstream.circuit_breaker import CircuitBreaker, CircuitBreakerOpen
+
+
+@pytest.fixture
+def circuit_breaker(timer):
+    return CircuitBreaker(
+        "test-api",
+        failure_threshold=0.5,
+        minimum_calls=4,
+        window_size=10,
+        reset_timeout=30,
+        timer=timer,
+    )
+
+
+def _record(circuit_breaker, outcomes):
+    for failed in outcomes:
+        circuit_breaker.before_call()
+        if failed:
+            circuit_breaker.record_failure()
+        else:
+            circuit_breaker.record_success()
+
+
+def test_circuit_breaker_stays_closed_below_minimum_calls(circuit_breaker):
+    _record(circuit_breaker, [True, True, True])
+
+    assert circuit_breaker.state == CircuitBreaker.CLOSED
+    circuit_breaker.before_call()
+
+
+def test_circuit_breaker_stays_closed_below_failure_threshold(circuit_breaker):
+    _record(circuit_breaker, [False, False, True, False, False, True, False])
+
+    assert circuit_breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_opens_at_failure_threshold(circuit_breaker, mocker):
+    mock_rejections = mocker.patch.object(circuit_breaker, "_rejections")
+    _record(circuit_breaker, [False, True, False, True])
+
+    assert circuit_breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitBreakerOpen):
+        circuit_breaker.before_call()
+    mock_rejections.inc.assert_called_once_with()
+
+
+def test_circuit_breaker_only_counts_failures_in_window(circuit_breaker):
+    _record(circuit_breaker, [True, True, True] + [False] * 7)
+    _record(circuit_breaker, [False, False, True, True])
+
+    assert circuit_breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_lets_one_trial_request_through_after_reset_timeout(circuit_breaker, timer):
+    _record(circuit_breaker, [True] * 4)
+
+    timer.now = 29
+    assert circuit_breaker.state == CircuitBreaker.OPEN
+
+    timer.now = 30
+    assert circuit_breaker.state == CircuitBreaker.HALF_OPEN
+    circuit_breaker.before_call()
+    with pytest.raises(CircuitBreakerOpen):
+        circuit_breaker.before_call()
+
+
+def test_circuit_breaker_closes_if_trial_request_succeeds(circuit_breaker, timer):
+    _record(circuit_breaker, [True] * 4)
+    timer.now = 30
+
+    _record(circuit_breaker, [False])
+
+    assert circuit_breaker.state == CircuitBreaker.CLOSED
+    # starts counting failures again from scratch
+    _record(circuit_breaker, [True, True, True])
+    assert circuit_breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_reopens_if_trial_request_fails(circuit_breaker, timer):
+    _record(circuit_breaker, [True] * 4)
+    timer.now = 30
+
+    _record(circuit_breaker, [True])
+
+    assert circuit_breaker.state == CircuitBreaker.OPEN
+    timer.now = 59
+    assert circuit_breaker.state == CircuitBreaker.OPEN
+    timer.now = 60
+    assert circuit_breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_circuit_breaker_allows_another_trial_if_one_never_finishes(circuit_breaker, timer):
+    _record(circuit_breaker, [True] * 4)
+    timer.now = 30
+    circuit_breaker.before_call()
+
+    timer.now = 60
+    circuit_breaker.before_call()
+
+
+def test_circuit_breaker_exports_state(circuit_breaker, mocker):
+    mock_state_metric = mocker.patch.object(circuit_breaker, "_state_metric")
+
+    _record(circuit_breaker, [True] * 4)
+
+    mock_state_metric.set.assert_called_once_with(2)
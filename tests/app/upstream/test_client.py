@@ -0,0 +1,225 @@
+from collections import deque
+
+import pytest
+import requests
+import requests_mock
+from notifications_utils.eventlet import EventletTimeout
+
+from app.upstream.budget import RequestBudget
+from app.upstream.bulkhead import Bulkhead, BulkheadFull
+from app.upstream.circuit_breaker import CircuitBreaker, CircuitBreakerOpen
+from app.upstream.client import UpstreamClient, endpoint_template
+from app.upstream.deadline import reset_deadline, set_deadline
+from app.upstream.retry import RetryPolicy
+from app.upstream.session import PooledSession
+
+
+@pytest.fixture
+def upstream_client():
+    return UpstreamClient(
+        "test-api",
+        session=PooledSession(pool_maxsize=10),
+        connect_timeout=1,
+        read_timeout=5,
+        circuit_breaker=CircuitBreaker(
+            "test-api", failure_threshold=0.5, minimum_calls=2, window_size=10, reset_timeout=30
+        ),
+        bulkhead=Bulkhead("test-api", max_concurrent=10, max_queued=10, max_wait=1),
+        retry_policy=RetryPolicy(
+            "test-api", max_attempts=1, base_delay=0, max_delay=0, budget=RequestBudget(ratio=0.1, max_balance=10)
+        ),
+    )
+
+
+def test_upstream_client_sets_timeouts(upstream_client, rmock, mocker):
+    mock_request = mocker.spy(upstream_client.session, "request")
+    rmock.get("https://example.gov.uk/foo", json={"foo": "bar"})
+
+    response = upstream_client.get("https://example.gov.uk/foo", headers={"some": "header"}, timeout=30)
+
+    assert response.json() == {"foo": "bar"}
+    mock_request.assert_called_once_with(
+        "GET", "https://example.gov.uk/foo", headers={"some": "header"}, timeout=(1, 5)
+    )
+    assert rmock.request_history[0].timeout == (1, 5)
+
+
+@pytest.mark.parametrize("status_code", [500, 502, 503])
+def test_upstream_client_counts_server_errors_as_failures(upstream_client, rmock, status_code):
+    rmock.get("https://example.gov.uk/foo", status_code=status_code)
+
+    upstream_client.get("https://example.gov.uk/foo")
+    upstream_client.get("https://example.gov.uk/foo")
+
+    assert upstream_client.circuit_breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitBreakerOpen):
+        upstream_client.get("https://example.gov.uk/foo")
+    assert len(rmock.request_history) == 2
+
+
+def test_upstream_client_counts_connection_errors_as_failures(upstream_client, rmock):
+    rmock.get("https://example.gov.uk/foo", exc=requests.exceptions.ConnectTimeout)
+
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectTimeout):
+            upstream_client.get("https://example.gov.uk/foo")
+
+    assert upstream_client.circuit_breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.parametrize("status_code", [200, 400, 404, 429])
+def test_upstream_client_does_not_count_other_responses_as_failures(upstream_client, rmock, status_code):
+    rmock.post("https://example.gov.uk/foo", status_code=status_code)
+
+    for _ in range(5):
+        upstream_client.post("https://example.gov.uk/foo", json={})
+
+    assert upstream_client.circuit_breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.parametrize(
+    "url, expected_template",
+    [
+        ("http://test-notify-api/service/0d2e9b93-1b6b-4a8e-9d55-0aa1c1f2d9a1", "/service/<id>"),
+        (
+            "https://download.gov.uk/services/0d2e9b93-1b6b-4a8e-9d55-0aa1c1f2d9a1/documents/"
+            "5E2CA4AF-5D65-4BB5-8B21-D4F0AC4B4E1F/check?key=1234",
+            "/services/<id>/documents/<id>/check",
+        ),
+        (
+            "https://download.gov.uk/services/0d2e9b93-1b6b-4a8e-9d55-0aa1c1f2d9a1/documents/"
+            "5e2ca4af-5d65-4bb5-8b21-d4f0ac4b4e1f.pdf",
+            "/services/<id>/documents/<id>.pdf",
+        ),
+        ("https://download.gov.uk/_status", "/_status"),
+    ],
+)
+def test_endpoint_template(url, expected_template):
+    assert endpoint_template(url) == expected_template
+
+
+@pytest.mark.parametrize("status_code, expected_status_class", [(200, "2xx"), (404, "4xx"), (503, "5xx")])
+def test_upstream_client_records_duration_of_requests(
+    upstream_client, rmock, mocker, status_code, expected_status_class
+):
+    mock_duration = mocker.patch("app.upstream.client.UPSTREAM_REQUEST_DURATION")
+    rmock.post(requests_mock.ANY, status_code=status_code)
+
+    upstream_client.post(
+        "https://example.gov.uk/services/0d2e9b93-1b6b-4a8e-9d55-0aa1c1f2d9a1/documents/"
+        "5e2ca4af-5d65-4bb5-8b21-d4f0ac4b4e1f/authenticate"
+    )
+
+    mock_duration.labels.assert_called_once_with(
+        "test-api", "/services/<id>/documents/<id>/authenticate", expected_status_class
+    )
+    assert mock_duration.labels.return_value.observe.call_count == 1
+
+
+def test_upstream_client_records_duration_of_requests_that_error(upstream_client, rmock, mocker):
+    mock_duration = mocker.patch("app.upstream.client.UPSTREAM_REQUEST_DURATION")
+    rmock.get("https://example.gov.uk/foo", exc=requests.exceptions.ReadTimeout)
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        upstream_client.get("https://example.gov.uk/foo")
+
+    mock_duration.labels.assert_called_once_with("test-api", "/foo", "error")
+    assert mock_duration.labels.return_value.observe.call_count == 1
+
+
+@pytest.fixture
+def deadline_in_2_seconds():
+    token = set_deadline(2)
+    yield
+    reset_deadline(token)
+
+
+def test_upstream_client_shortens_timeouts_to_meet_deadline(upstream_client, rmock, deadline_in_2_seconds):
+    rmock.get("https://example.gov.uk/foo")
+
+    upstream_client.get("https://example.gov.uk/foo")
+
+    connect_timeout, read_timeout = rmock.request_history[0].timeout
+    assert connect_timeout == 1
+    assert 1.9 < read_timeout <= 2
+
+
+def test_upstream_client_does_not_start_calls_after_deadline(upstream_client, rmock):
+    token = set_deadline(-1)
+    try:
+        with pytest.raises(EventletTimeout):
+            upstream_client.get("https://example.gov.uk/foo")
+    finally:
+        reset_deadline(token)
+
+    assert rmock.called is False
+
+
+def test_upstream_client_raises_eventlet_timeout_if_deadline_cut_call_short(
+    upstream_client, rmock, deadline_in_2_seconds
+):
+    rmock.get("https://example.gov.uk/foo", exc=requests.exceptions.ReadTimeout)
+
+    for _ in range(2):
+        with pytest.raises(EventletTimeout):
+            upstream_client.get("https://example.gov.uk/foo")
+
+    # it's not the upstream's fault that we didn't give it as long as usual
+    assert upstream_client.circuit_breaker.state == CircuitBreaker.CLOSED
+
+
+def test_upstream_client_refuses_requests_past_concurrency_limit(upstream_client, rmock):
+    upstream_client.bulkhead = Bulkhead("test-api", max_concurrent=1, max_queued=0, max_wait=1)
+    rmock.get("https://example.gov.uk/foo")
+
+    with upstream_client.bulkhead.slot():
+        with pytest.raises(BulkheadFull):
+            upstream_client.get("https://example.gov.uk/foo")
+
+    assert rmock.called is False
+    assert upstream_client.circuit_breaker._outcomes == deque()
+
+    upstream_client.get("https://example.gov.uk/foo")
+
+    assert rmock.call_count == 1
+
+
+@pytest.fixture
+def retrying_upstream_client(upstream_client):
+    upstream_client.circuit_breaker = CircuitBreaker(
+        "test-api", failure_threshold=0.5, minimum_calls=10, window_size=10, reset_timeout=30
+    )
+    upstream_client.retry_policy = RetryPolicy(
+        "test-api", max_attempts=3, base_delay=0, max_delay=0, budget=RequestBudget(ratio=0.1, max_balance=10)
+    )
+    return upstream_client
+
+
+def test_upstream_client_retries_gets_that_get_transient_errors(retrying_upstream_client, rmock):
+    rmock.get(
+        "https://example.gov.uk/foo",
+        [{"exc": requests.exceptions.ConnectionError}, {"status_code": 503}, {"json": {"foo": "bar"}}],
+    )
+
+    response = retrying_upstream_client.get("https://example.gov.uk/foo")
+
+    assert response.json() == {"foo": "bar"}
+    assert rmock.call_count == 3
+
+
+def test_upstream_client_returns_last_response_after_max_attempts(retrying_upstream_client, rmock):
+    rmock.get("https://example.gov.uk/foo", status_code=502)
+
+    response = retrying_upstream_client.get("https://example.gov.uk/foo")
+
+    assert response.status_code == 502
+    assert rmock.call_count == 3
+
+
+def test_upstream_client_never_retries_posts(retrying_upstream_client, rmock):
+    rmock.post("https://example.gov.uk/authenticate", status_code=503)
+
+    response = retrying_upstream_client.post("https://example.gov.uk/authenticate", json={"key": "1234"})
+
+    assert response.status_code == 503
+    assert rmock.call_count == 1
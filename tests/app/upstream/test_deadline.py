@@ -0,0 +1,42 @@
+import pytest
+from notifications_utils.eventlet import EventletTimeout
+
+from app.upstream.deadline import limit_timeout, reset_deadline, set_deadline
+
+
+@pytest.fixture
+def deadline_in_5_seconds():
+    token = set_deadline(5, timer=lambda: 100)
+    yield
+    reset_deadline(token)
+
+
+def test_limit_timeout_without_deadline():
+    assert limit_timeout((3, 10)) == ((3, 10), False)
+
+
+@pytest.mark.parametrize(
+    "now, expected_result",
+    [
+        (90, ((3, 10), False)),
+        (95, ((3, 10), False)),
+        (98, ((3, 7), True)),
+        (102.5, ((2.5, 2.5), True)),
+        (103, ((2, 2), True)),
+    ],
+)
+def test_limit_timeout_shortens_timeouts_past_deadline(deadline_in_5_seconds, now, expected_result):
+    assert limit_timeout((3, 10), timer=lambda: now) == expected_result
+
+
+@pytest.mark.parametrize("now", [105, 110])
+def test_limit_timeout_raises_once_deadline_has_passed(deadline_in_5_seconds, now):
+    with pytest.raises(EventletTimeout):
+        limit_timeout((3, 10), timer=lambda: now)
+
+
+def test_reset_deadline():
+    token = set_deadline(0)
+    reset_deadline(token)
+
+    assert limit_timeout((3, 10)) == ((3, 10), False)
@@ -0,0 +1,156 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+
+from app.upstream.dns import DNSCache
+from app.upstream.session import PooledSession
+
+
+class FakeResolver:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = []
+
+    def __call__(self, host):
+        self.calls.append(host)
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def _dns_cache(resolver, timer, **kwargs):
+    return DNSCache(
+        hosts=["api.test", "127.0.0.1", None],
+        default_ttl=30,
+        min_ttl=5,
+        max_ttl=300,
+        resolve=resolver,
+        timer=timer,
+        **kwargs,
+    )
+
+
+def test_dns_cache_looks_up_host_once_within_ttl(timer, mocker):
+    mock_cache_lookups = mocker.patch("app.upstream.dns.DNS_CACHE_LOOKUPS")
+    resolver = FakeResolver((["10.0.0.1", "10.0.0.2"], 60))
+    dns_cache = _dns_cache(resolver, timer)
+
+    assert dns_cache.resolve("api.test") == ["10.0.0.1", "10.0.0.2"]
+    timer.now = 44
+    assert dns_cache.resolve("api.test") == ["10.0.0.1", "10.0.0.2"]
+
+    assert resolver.calls == ["api.test"]
+    assert [call.args for call in mock_cache_lookups.labels.call_args_list] == [
+        ("api.test", "miss"),
+        ("api.test", "hit"),
+    ]
+
+
+def test_dns_cache_only_caches_configured_host_names(timer):
+    dns_cache = _dns_cache(FakeResolver(), timer)
+
+    assert dns_cache.hosts == {"api.test"}
+    assert dns_cache.resolve("other.test") is None
+    assert dns_cache.resolve("127.0.0.1") is None
+
+
+@pytest.mark.parametrize("ttl, expected_ttl", [(1, 5), (60, 60), (3600, 300), (None, 30)])
+def test_dns_cache_keeps_ttls_within_limits(timer, ttl, expected_ttl):
+    resolver = FakeResolver((["10.0.0.1"], ttl), (["10.0.0.2"], ttl))
+    dns_cache = _dns_cache(resolver, timer, refresh_after=1)
+
+    dns_cache.resolve("api.test")
+    timer.now = expected_ttl - 0.1
+    assert dns_cache.resolve("api.test") == ["10.0.0.1"]
+    timer.now = expected_ttl
+    assert dns_cache.resolve("api.test") == ["10.0.0.2"]
+
+
+def test_dns_cache_refreshes_addresses_in_background_before_they_expire(timer, mocker):
+    mock_background_call = mocker.patch("app.upstream.dns.BackgroundCall")
+    resolver = FakeResolver((["10.0.0.1"], 60), (["10.0.0.2"], 60))
+    dns_cache = _dns_cache(resolver, timer)
+
+    dns_cache.resolve("api.test")
+    timer.now = 45
+    assert dns_cache.resolve("api.test") == ["10.0.0.1"]
+    assert dns_cache.resolve("api.test") == ["10.0.0.1"]
+
+    mock_background_call.assert_called_once_with(dns_cache._refresh, "api.test")
+
+    dns_cache._refresh("api.test")
+
+    assert dns_cache.resolve("api.test") == ["10.0.0.2"]
+    assert dns_cache._refreshing == set()
+
+
+def test_dns_cache_uses_expired_addresses_if_lookup_fails(timer, mocker):
+    mock_cache_lookups = mocker.patch("app.upstream.dns.DNS_CACHE_LOOKUPS")
+    mock_lookups = mocker.patch("app.upstream.dns.DNS_LOOKUPS")
+    resolver = FakeResolver((["10.0.0.1"], 60), socket.gaierror("temporary failure"))
+    dns_cache = _dns_cache(resolver, timer)
+
+    dns_cache.resolve("api.test")
+    timer.now = 60
+
+    assert dns_cache.resolve("api.test") == ["10.0.0.1"]
+    mock_cache_lookups.labels.assert_called_with("api.test", "stale")
+    mock_lookups.labels.assert_called_with("api.test", "failure")
+
+
+def test_dns_cache_raises_if_first_lookup_fails(timer):
+    dns_cache = _dns_cache(FakeResolver(socket.gaierror("no such host")), timer)
+
+    with pytest.raises(socket.gaierror):
+        dns_cache.resolve("api.test")
+
+
+@pytest.fixture
+def local_server():
+    requests_received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_received.append(self.headers["Host"])
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    yield server.server_address[1], requests_received
+
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+def test_pooled_session_connects_to_address_from_dns_cache(local_server, timer):
+    port, requests_received = local_server
+    resolver = FakeResolver((["192.0.2.1", "127.0.0.1"], 60))
+    session = PooledSession(pool_maxsize=10, dns_cache=_dns_cache(resolver, timer))
+
+    # the first address can't be connected to, so the next is tried
+    response = session.get(f"http://api.test:{port}/", timeout=(0.5, 5))
+
+    assert response.text == "ok"
+    assert requests_received == [f"api.test:{port}"]
+    assert resolver.calls == ["api.test"]
+
+
+def test_pooled_session_reports_failed_lookups_as_connection_errors(timer):
+    resolver = FakeResolver(socket.gaierror("no such host"))
+    session = PooledSession(pool_maxsize=10, dns_cache=_dns_cache(resolver, timer))
+
+    with pytest.raises(requests.ConnectionError):
+        session.get("http://api.test/", timeout=(0.5, 5))
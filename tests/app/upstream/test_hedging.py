@@ -0,0 +1,187 @@
+import eventlet
+import pytest
+
+from app.upstream.budget import RequestBudget
+from app.upstream.hedging import Hedger, LatencyTracker
+
+
+@pytest.fixture
+def hedger():
+    latencies = LatencyTracker(window_size=100, min_samples=10)
+    for _ in range(10):
+        latencies.record(0.01)
+
+    return Hedger(
+        "test",
+        percentile=95,
+        min_delay=0.01,
+        budget=RequestBudget(ratio=0.1, max_balance=1),
+        latencies=latencies,
+    )
+
+
+def _call_taking(*durations, errors=()):
+    calls = []
+
+    def _call(value):
+        duration = durations[len(calls)]
+        calls.append(duration)
+        eventlet.sleep(duration)
+        if duration in errors:
+            raise ValueError(f"{value} failed after {duration}")
+        return f"{value} after {duration}"
+
+    return _call, calls
+
+
+def test_latency_tracker_percentile():
+    latencies = LatencyTracker(window_size=100, min_samples=10, resort_every=1)
+    for duration in range(1, 10):
+        latencies.record(duration)
+
+    assert latencies.percentile(50) is None
+
+    latencies.record(10)
+
+    assert latencies.percentile(0) == 1
+    assert latencies.percentile(50) == 6
+    assert latencies.percentile(90) == 10
+    assert latencies.percentile(100) == 10
+
+
+def test_latency_tracker_only_resorts_durations_every_so_often():
+    latencies = LatencyTracker(window_size=100, min_samples=2, resort_every=3)
+    for duration in (1, 2):
+        latencies.record(duration)
+
+    assert latencies.percentile(100) == 2
+
+    latencies.record(10)
+    latencies.record(20)
+    assert latencies.percentile(100) == 2
+
+    latencies.record(30)
+    assert latencies.percentile(100) == 30
+
+
+def test_latency_tracker_only_keeps_recent_durations():
+    latencies = LatencyTracker(window_size=2, min_samples=2, resort_every=1)
+    for duration in (100, 1, 2):
+        latencies.record(duration)
+
+    assert latencies.percentile(100) == 2
+
+
+def test_hedger_does_not_hedge_fast_calls(hedger, mocker):
+    mock_hedged_calls = mocker.patch("app.upstream.hedging.HEDGED_CALLS")
+    func, calls = _call_taking(0)
+
+    assert hedger.call(func, "foo") == "foo after 0"
+
+    assert calls == [0]
+    mock_hedged_calls.labels.assert_called_once_with("test", "not_needed")
+
+
+def test_hedger_uses_whichever_call_answers_first(hedger, mocker):
+    mock_hedged_calls = mocker.patch("app.upstream.hedging.HEDGED_CALLS")
+    func, calls = _call_taking(0.5, 0)
+
+    assert hedger.call(func, "foo") == "foo after 0"
+
+    assert calls == [0.5, 0]
+    mock_hedged_calls.labels.assert_called_once_with("test", "hedge_won")
+
+
+def test_hedger_can_use_first_call_after_hedging(hedger, mocker):
+    mock_hedged_calls = mocker.patch("app.upstream.hedging.HEDGED_CALLS")
+    func, calls = _call_taking(0.05, 0.5)
+
+    assert hedger.call(func, "foo") == "foo after 0.05"
+
+    assert calls == [0.05, 0.5]
+    mock_hedged_calls.labels.assert_called_once_with("test", "primary_won")
+
+
+def test_hedger_waits_for_the_first_call_if_the_hedge_fails(hedger, mocker):
+    mock_hedged_calls = mocker.patch("app.upstream.hedging.HEDGED_CALLS")
+    func, calls = _call_taking(0.1, 0, errors=(0,))
+
+    assert hedger.call(func, "foo") == "foo after 0.1"
+
+    assert calls == [0.1, 0]
+    mock_hedged_calls.labels.assert_called_once_with("test", "primary_won")
+
+
+def test_hedger_waits_for_the_hedge_if_the_first_call_fails(hedger, mocker):
+    mock_hedged_calls = mocker.patch("app.upstream.hedging.HEDGED_CALLS")
+    func, calls = _call_taking(0.05, 0.1, errors=(0.05,))
+
+    assert hedger.call(func, "foo") == "foo after 0.1"
+
+    mock_hedged_calls.labels.assert_called_once_with("test", "hedge_won")
+
+
+def test_hedger_treats_results_as_failures_if_told_to(hedger, mocker):
+    mocker.patch("app.upstream.hedging.HEDGED_CALLS")
+    hedger.is_failure = lambda result: result == "foo after 0"
+    func, calls = _call_taking(0.1, 0)
+
+    assert hedger.call(func, "foo") == "foo after 0.1"
+
+
+def test_hedger_raises_error_from_last_call_to_fail_if_both_fail(hedger, mocker):
+    mock_hedged_calls = mocker.patch("app.upstream.hedging.HEDGED_CALLS")
+    func, calls = _call_taking(0.1, 0, errors=(0.1, 0))
+
+    with pytest.raises(ValueError, match="foo failed after 0.1"):
+        hedger.call(func, "foo")
+
+    mock_hedged_calls.labels.assert_called_once_with("test", "both_failed")
+
+
+def test_hedger_only_records_how_long_first_calls_take(hedger, mocker):
+    mocker.patch("app.upstream.hedging.HEDGED_CALLS")
+    func, calls = _call_taking(0.1, 0)
+
+    hedger.call(func, "foo")
+    eventlet.sleep(0.15)
+
+    assert len(hedger.latencies._durations) == 11
+    assert hedger.latencies._durations[-1] >= 0.1
+
+
+def test_hedger_does_not_hedge_once_budget_is_used_up(hedger, mocker):
+    mock_hedged_calls = mocker.patch("app.upstream.hedging.HEDGED_CALLS")
+    hedger.budget._balance = 0
+    func, calls = _call_taking(0.05)
+
+    assert hedger.call(func, "foo") == "foo after 0.05"
+
+    assert calls == [0.05]
+    mock_hedged_calls.labels.assert_called_once_with("test", "budget_exhausted")
+
+
+def test_hedger_does_not_hedge_until_it_knows_what_is_slow(mocker):
+    mock_hedged_calls = mocker.patch("app.upstream.hedging.HEDGED_CALLS")
+    hedger = Hedger(
+        "test",
+        percentile=95,
+        min_delay=0.01,
+        budget=RequestBudget(ratio=0.1, max_balance=1),
+        latencies=LatencyTracker(window_size=100, min_samples=10),
+    )
+    func, calls = _call_taking(0.05)
+
+    assert hedger.call(func, "foo") == "foo after 0.05"
+
+    assert calls == [0.05]
+    assert mock_hedged_calls.labels.called is False
+    assert hedger.latencies._durations[0] >= 0.05
+
+
+def test_hedger_raises_errors_from_first_call_to_answer(hedger):
+    def _call():
+        raise ValueError("nope")
+
+    with pytest.raises(ValueError, match="nope"):
+        hedger.call(_call)
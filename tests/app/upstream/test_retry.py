@@ -0,0 +1,87 @@
+from unittest import mock
+
+import pytest
+import requests
+
+from app.upstream.budget import RequestBudget
+from app.upstream.bulkhead import BulkheadFull
+from app.upstream.circuit_breaker import CircuitBreakerOpen
+from app.upstream.deadline import reset_deadline, set_deadline
+from app.upstream.retry import RetryPolicy
+
+
+@pytest.fixture
+def retry_policy():
+    return RetryPolicy(
+        "test-api",
+        max_attempts=3,
+        base_delay=0.1,
+        max_delay=0.3,
+        budget=RequestBudget(ratio=0.1, max_balance=10),
+        random=lambda: 1,
+    )
+
+
+@pytest.mark.parametrize("attempt, expected_delay", [(1, 0.1), (2, 0.2), (3, 0.3), (10, 0.3)])
+def test_retry_policy_backoff_is_exponential_up_to_max_delay(retry_policy, attempt, expected_delay):
+    assert retry_policy.backoff(attempt) == pytest.approx(expected_delay)
+
+
+def test_retry_policy_backoff_is_jittered(retry_policy):
+    retry_policy._random = lambda: 0.25
+
+    assert retry_policy.backoff(2) == pytest.approx(0.05)
+
+
+@pytest.mark.parametrize("status_code", [502, 503, 504])
+def test_retry_policy_retries_gets_that_got_transient_errors(retry_policy, status_code, mocker):
+    mock_retries = mocker.patch("app.upstream.retry.UPSTREAM_RETRIES")
+
+    assert retry_policy.retry_delay("GET", 1, response=mock.Mock(status_code=status_code)) == pytest.approx(0.1)
+    mock_retries.labels.assert_called_once_with("test-api", "retried")
+
+
+@pytest.mark.parametrize(
+    "error", [requests.ConnectionError("reset"), requests.exceptions.ConnectTimeout("could not connect")]
+)
+def test_retry_policy_retries_gets_that_could_not_connect(retry_policy, error):
+    assert retry_policy.retry_delay("GET", 1, error=error) == pytest.approx(0.1)
+
+
+@pytest.mark.parametrize("status_code", [200, 400, 404, 410, 429, 500])
+def test_retry_policy_does_not_retry_other_responses(retry_policy, status_code):
+    assert retry_policy.retry_delay("GET", 1, response=mock.Mock(status_code=status_code)) is None
+
+
+@pytest.mark.parametrize("error", [CircuitBreakerOpen("open"), BulkheadFull("full")])
+def test_retry_policy_does_not_retry_requests_we_chose_not_to_send(retry_policy, error):
+    assert retry_policy.retry_delay("GET", 1, error=error) is None
+
+
+@pytest.mark.parametrize("method", ["POST", "PUT", "DELETE", "PATCH"])
+def test_retry_policy_never_retries_non_idempotent_requests(retry_policy, method):
+    assert retry_policy.retry_delay(method, 1, response=mock.Mock(status_code=503)) is None
+    assert retry_policy.retry_delay(method, 1, error=requests.ConnectionError("reset")) is None
+
+
+def test_retry_policy_stops_after_max_attempts(retry_policy):
+    assert retry_policy.retry_delay("GET", 2, response=mock.Mock(status_code=503)) == pytest.approx(0.2)
+    assert retry_policy.retry_delay("GET", 3, response=mock.Mock(status_code=503)) is None
+
+
+def test_retry_policy_does_not_retry_once_budget_is_used_up(retry_policy, mocker):
+    mock_retries = mocker.patch("app.upstream.retry.UPSTREAM_RETRIES")
+    retry_policy.budget._balance = 0.5
+
+    assert retry_policy.retry_delay("GET", 1, response=mock.Mock(status_code=503)) is None
+    mock_retries.labels.assert_called_once_with("test-api", "budget_exhausted")
+
+
+def test_retry_policy_does_not_retry_if_wait_would_pass_deadline(retry_policy):
+    token = set_deadline(0.05)
+    try:
+        assert retry_policy.retry_delay("GET", 1, response=mock.Mock(status_code=503)) is None
+    finally:
+        reset_deadline(token)
+
+    assert retry_policy.budget._balance == 10
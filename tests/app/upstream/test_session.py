@@ -0,0 +1,42 @@
+from app import get_upstream_session
+from app.upstream.session import PooledSession
+
+
+def test_pooled_session_sizes_its_connection_pool():
+    session = PooledSession(pool_maxsize=5)
+
+    assert session.get_adapter("https://example.gov.uk")._pool_maxsize == 5
+    assert session.get_adapter("http://example.gov.uk")._pool_maxsize == 5
+    assert session.get_adapter("http://example.gov.uk")._pool_block is False
+
+
+def test_pooled_session_does_not_keep_cookies_between_requests(rmock):
+    session = PooledSession(pool_maxsize=5)
+    rmock.get("https://example.gov.uk/first", headers={"Set-Cookie": "session=someone-elses"})
+    rmock.get("https://example.gov.uk/second")
+
+    session.get("https://example.gov.uk/first")
+    session.get("https://example.gov.uk/second")
+
+    assert len(session.cookies) == 0
+    assert "Cookie" not in rmock.request_history[1].headers
+
+
+def test_pooled_session_records_pool_metrics(rmock, mocker):
+    mock_connections = mocker.patch("app.upstream.session.UPSTREAM_POOL_CONNECTIONS")
+    mock_requests = mocker.patch("app.upstream.session.UPSTREAM_POOL_REQUESTS")
+    session = PooledSession(pool_maxsize=5)
+    rmock.get("https://example.gov.uk/foo")
+
+    session.get("https://example.gov.uk/foo")
+
+    mock_connections.labels.assert_called_once_with("example.gov.uk")
+    mock_requests.labels.assert_called_once_with("example.gov.uk")
+
+
+def test_upstream_session_is_shared_by_the_process(app_):
+    session = get_upstream_session()
+
+    assert isinstance(session, PooledSession)
+    assert get_upstream_session() is session
+    assert session.get_adapter(app_.config["DOCUMENT_DOWNLOAD_API_HOST_NAME_INTERNAL"])._pool_maxsize == 1000
@@ -0,0 +1,152 @@
+import threading
+import time
+
+import pytest
+from greenlet import GreenletExit
+
+from app.upstream.deadline import DeadlineExceeded
+from app.upstream.singleflight import SingleFlight
+
+
+def _wait_for_followers(singleflight, key, count):
+    for _ in range(500):
+        if key in singleflight._calls and singleflight._calls[key].followers == count:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"never had {count} followers")
+
+
+def _start_threads(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def test_singleflight_returns_result_of_call():
+    singleflight = SingleFlight("test")
+
+    assert singleflight.do("foo", lambda a, b: a + b, 1, b=2) == 3
+    assert singleflight._calls == {}
+
+
+def test_singleflight_shares_one_call_between_concurrent_callers(mocker):
+    mock_calls = mocker.patch("app.upstream.singleflight.SINGLEFLIGHT_CALLS")
+    singleflight = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def _slow_call():
+        calls.append("called")
+        release.wait()
+        return {"data": "foo"}
+
+    threads = _start_threads(5, lambda: results.append(singleflight.do("foo", _slow_call)))
+    _wait_for_followers(singleflight, "foo", 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["called"]
+    assert results == [{"data": "foo"}] * 5
+    mock_calls.labels.assert_any_call("test", "leader")
+    mock_calls.labels.assert_any_call("test", "follower")
+
+
+def test_singleflight_shares_errors_between_concurrent_callers():
+    singleflight = SingleFlight("test")
+    release = threading.Event()
+    errors = []
+
+    def _failing_call():
+        release.wait()
+        raise ValueError("oh no")
+
+    def _caller():
+        try:
+            singleflight.do("foo", _failing_call)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = _start_threads(3, _caller)
+    _wait_for_followers(singleflight, "foo", 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 3
+    assert singleflight._calls == {}
+
+
+@pytest.mark.parametrize("leaders_error", [GreenletExit, DeadlineExceeded])
+def test_singleflight_makes_the_call_again_if_the_leader_gives_up(leaders_error):
+    singleflight = SingleFlight("test")
+    release = threading.Event()
+    release_retry = threading.Event()
+    calls = []
+    results = []
+
+    def _call():
+        calls.append("called")
+        if len(calls) == 1:
+            release.wait()
+            raise leaders_error
+        release_retry.wait()
+        return {"data": "foo"}
+
+    def _caller():
+        try:
+            results.append(singleflight.do("foo", _call))
+        except leaders_error:
+            results.append("gave up")
+
+    threads = _start_threads(1, _caller)
+    _wait_for_followers(singleflight, "foo", 0)
+    threads += _start_threads(3, _caller)
+    _wait_for_followers(singleflight, "foo", 3)
+    release.set()
+    # one of the followers makes the call again, and the others wait for it
+    _wait_for_followers(singleflight, "foo", 2)
+    release_retry.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["called", "called"]
+    assert results.count("gave up") == 1
+    assert [result for result in results if result != "gave up"] == [{"data": "foo"}] * 3
+    assert singleflight._calls == {}
+
+
+def test_singleflight_does_not_share_calls_for_different_keys():
+    singleflight = SingleFlight("test")
+
+    assert singleflight.do("foo", lambda: "foo") == "foo"
+    assert singleflight.do("bar", lambda: "bar") == "bar"
+
+
+def test_singleflight_makes_a_new_call_once_the_last_has_finished():
+    singleflight = SingleFlight("test")
+
+    with pytest.raises(ValueError):
+        singleflight.do("foo", lambda: int("not a number"))
+
+    assert singleflight.do("foo", lambda: "foo") == "foo"
+
+
+def test_singleflight_in_flight():
+    singleflight = SingleFlight("test")
+    release = threading.Event()
+
+    assert singleflight.in_flight("foo") is False
+
+    threads = _start_threads(1, lambda: singleflight.do("foo", release.wait))
+    _wait_for_followers(singleflight, "foo", 0)
+
+    assert singleflight.in_flight("foo") is True
+    assert singleflight.in_flight("bar") is False
+
+    release.set()
+    threads[0].join()
+
+    assert singleflight.in_flight("foo") is False
@@ -98,3 +98,17 @@ def document_has_metadata_requires_confirmation(service_id, document_id, key, rm
 @pytest.fixture(scope="function")
 def fake_nonce():
     return "TESTs5Vr8v3jgRYLoQuVwA"
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def timer():
+    # for anything taking a `timer`. Stays at `timer.now` until a test moves it on
+    return FakeTimer()